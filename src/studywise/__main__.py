@@ -1,4 +1,8 @@
+import multiprocessing
+
 from studywise.ui.app import main
 
 if __name__ == "__main__":
+    # Needed for the OCR process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
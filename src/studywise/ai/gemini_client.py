@@ -1,41 +1,317 @@
-import google.generativeai as genai
+import asyncio
+import itertools
+import re
+import threading
 import time
+from typing import Callable, Iterator
 
+from studywise.ai.rate_limiter import RateLimiter, jittered
+from studywise.ai.tokens import estimate_tokens
 
-def gemini_summarize(prompt: str, api_key: str, max_retries: int = 3) -> str:
-    if not api_key:
-        raise RuntimeError("Gemini API key not set")
+DEFAULT_MODEL = "gemini-2.0-flash"
+# Free tier budgets of gemini-2.0-flash; 0 = no limit
+DEFAULT_RPM = 15
+DEFAULT_TPM = 1_000_000
+# Rate limited requests are retried more often than failed ones: with
+# the limiter paced by the server's retry-after hints they do go through
+RATE_LIMIT_RETRIES = 6
+# A longer retry-after hint means a daily quota is used up
+MAX_RETRY_WAIT = 120
+
+QUOTA_MESSAGE = (
+    "Gemini API quota exceeded. Free tier limit reached.\n\n"
+    "Options:\n"
+    "1. Wait and try again later\n"
+    "2. Upgrade to a paid Gemini API plan\n"
+    "3. Switch to Ollama in Settings (free, local AI)"
+)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    error_msg = str(error)
+    return "429" in error_msg or "quota" in error_msg.lower()
+
+
+class QuotaExceeded(RuntimeError):
+    """Still rate limited after all retries, or for longer than MAX_RETRY_WAIT."""
+
+
+_RETRY_HINTS = (
+    re.compile(r"retry[ _-]?(?:in|after)\W*([\d.]+)\s*(ms|s)?", re.I),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)()"),
+)
+
+
+def retry_after(error: Exception) -> float | None:
+    """Seconds the server asked to wait before retrying, if it said so."""
+    hint = getattr(error, "retry_after", None)
+    if isinstance(hint, (int, float)):
+        return float(hint)
+    for pattern in _RETRY_HINTS:
+        match = pattern.search(str(error))
+        if match:
+            try:
+                seconds = float(match.group(1))
+            except ValueError:
+                continue
+            return seconds / 1000 if match.group(2) == "ms" else seconds
+    return None
+
+
+def _response_text(response) -> str:
+    if not response or not response.text:
+        raise RuntimeError("Gemini returned empty response")
+    return response.text.strip()
+
+
+def sdk_model(api_key: str, model: str):
+    """GenerativeModel from the google-generativeai SDK."""
+    # Imported on first use: the SDK is slow to load and Ollama users never need it
+    import google.generativeai as genai
 
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-
-    for attempt in range(max_retries):
-        try:
-            response = model.generate_content(prompt)
-
-            if not response or not response.text:
-                raise RuntimeError("Gemini returned empty response")
-
-            return response.text.strip()
-
-        except Exception as e:
-            error_msg = str(e)
-            
-            # Handle rate limit errors (429)
-            if "429" in error_msg or "quota" in error_msg.lower():
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                    print(f"Rate limit hit. Retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
+    return genai.GenerativeModel(model)
+
+
+class GeminiClient:
+    """
+    Long-lived Gemini backend: the SDK is configured and the model built
+    once, on first use, instead of for every chunk.
+
+    `model_factory(api_key, model)` builds the object requests go to. It
+    must offer GenerativeModel's generate_content(prompt, stream=...) and
+    generate_content_async(prompt); pass a fake to run without the SDK
+    or a network.
+
+    Async requests run on an event loop thread owned by the client, so
+    concurrent chunks share one connection pool and waiting out a rate
+    limit doesn't hold up a thread.
+
+    Every request first waits for `limiter` (requests and estimated
+    tokens per minute). A rate limit error pauses the limiter for the
+    server's retry-after hint, or an exponential backoff without one,
+    so the other requests in flight slow down too.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = DEFAULT_MODEL,
+        max_retries: int = 3,
+        model_factory: Callable[[str, str], object] = sdk_model,
+        limiter: RateLimiter | None = None
+    ):
+        if not api_key:
+            raise RuntimeError("Gemini API key not set")
+        self.api_key = api_key
+        self.model = model
+        self.max_retries = max_retries
+        self._model_factory = model_factory
+        self.limiter = limiter or RateLimiter()
+        self._backend = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def _model(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = self._model_factory(self.api_key, self.model)
+            return self._backend
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Seconds to sleep before the next try, or raise if out of tries.
+        Rate limits pause the limiter instead, which the next try waits for.
+        """
+        rate_limited = _is_rate_limit(error)
+        retries = RATE_LIMIT_RETRIES if rate_limited else self.max_retries
+        hint = retry_after(error) if rate_limited else None
+        if attempt >= retries - 1 or (hint or 0) > MAX_RETRY_WAIT:
+            if rate_limited:
+                raise QuotaExceeded(QUOTA_MESSAGE)
+            raise error
+
+        wait_time = hint if hint is not None else 2 ** attempt  # Exponential backoff: 1s, 2s, 4s...
+        if rate_limited:
+            print(f"Rate limit hit. Retrying in {wait_time:.0f}s... (attempt {attempt + 1}/{retries})")
+            self.limiter.pause(wait_time)
+            return 0.0
+        print(f"Gemini request failed ({error}). Retrying in {wait_time}s... (attempt {attempt + 1}/{retries})")
+        return jittered(wait_time, self.limiter.jitter)
+
+    def generate(self, prompt: str) -> str:
+        model = self._model()
+        tokens = estimate_tokens(prompt)
+        for attempt in itertools.count():
+            self.limiter.wait(tokens)
+            try:
+                output = _response_text(model.generate_content(prompt))
+                self.limiter.charge(estimate_tokens(output))
+                return output
+            except Exception as e:
+                # Only rate limits are retried here; callers retry the rest
+                if not _is_rate_limit(e):
+                    raise
+                time.sleep(self._backoff(attempt, e))
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Like generate, but yields the response text piece by piece as
+        Gemini produces it. Rate limits are retried until the first piece
+        arrives; after that an error ends the stream.
+        """
+        model = self._model()
+        tokens = estimate_tokens(prompt)
+        for attempt in itertools.count():
+            self.limiter.wait(tokens)
+            started = False
+            try:
+                for chunk in model.generate_content(prompt, stream=True):
+                    text = chunk.text
+                    if text:
+                        started = True
+                        self.limiter.charge(estimate_tokens(text))
+                        yield text
+
+                if not started:
+                    raise RuntimeError("Gemini returned empty response")
+                return
+
+            except Exception as e:
+                if started or not _is_rate_limit(e):
+                    raise
+                time.sleep(self._backoff(attempt, e))
+
+    async def generate_content_async(
+        self,
+        prompt: str,
+        on_delta: Callable[[str], None] | None = None,
+        on_retry: Callable[[], None] | None = None
+    ) -> str:
+        """
+        Async generate. Every failure is retried, with the backoff awaited
+        rather than slept, so other requests on the loop keep going.
+        With `on_delta` the response is streamed and passed on piece by
+        piece; `on_retry` is called before a retry of a response that
+        was partly passed on.
+        """
+        model = self._model()
+        tokens = estimate_tokens(prompt)
+        for attempt in itertools.count():
+            await self.limiter.wait_async(tokens)
+            parts = []
+            try:
+                if on_delta is None:
+                    output = _response_text(await model.generate_content_async(prompt))
                 else:
-                    raise RuntimeError(
-                        "Gemini API quota exceeded. Free tier limit reached.\n\n"
-                        "Options:\n"
-                        "1. Wait and try again later\n"
-                        "2. Upgrade to a paid Gemini API plan\n"
-                        "3. Switch to Ollama in Settings (free, local AI)"
+                    response = await model.generate_content_async(prompt, stream=True)
+                    async for chunk in response:
+                        text = chunk.text
+                        if text:
+                            parts.append(text)
+                            on_delta(text)
+                    output = "".join(parts).strip()
+                    if not output:
+                        raise RuntimeError("Gemini returned empty response")
+                self.limiter.charge(estimate_tokens(output))
+                return output
+            except Exception as e:
+                wait_time = self._backoff(attempt, e)
+                if parts and on_retry is not None:
+                    on_retry()
+                await asyncio.sleep(wait_time)
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="gemini-client", daemon=True
+                ).start()
+            return self._loop
+
+    def generate_many(
+        self,
+        prompts: list[str],
+        concurrency: int = 4,
+        on_delta: Callable[[int, str], None] | None = None,
+        on_retry: Callable[[int], None] | None = None,
+        on_finish: Callable[[int, str], None] | None = None
+    ) -> list[str]:
+        """
+        Generate for several prompts, up to `concurrency` at a time, on
+        the client's event loop. Results come back in prompt order; if
+        one prompt fails for good, the others are cancelled.
+
+        With `on_delta(index, text)` responses are streamed (see
+        generate_content_async). `on_finish(index, output)` is called as
+        each response completes. Callbacks run on the event loop thread.
+        """
+        async def run_all() -> list[str]:
+            slots = asyncio.Semaphore(max(1, concurrency))
+
+            async def one(index: int, prompt: str) -> str:
+                async with slots:
+                    output = await self.generate_content_async(
+                        prompt,
+                        (lambda text: on_delta(index, text)) if on_delta else None,
+                        (lambda: on_retry(index)) if on_retry else None
                     )
-            
-            # For other errors, fail immediately
-            raise
+                if on_finish is not None:
+                    on_finish(index, output)
+                return output
+
+            tasks = [asyncio.ensure_future(one(i, p)) for i, p in enumerate(prompts)]
+            try:
+                return await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        return asyncio.run_coroutine_threadsafe(run_all(), self._event_loop()).result()
+
+    def close(self) -> None:
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+_client: GeminiClient | None = None
+_client_model = DEFAULT_MODEL
+_client_lock = threading.Lock()
+# Kept across client rebuilds: the budget belongs to the API key's project
+_limiter = RateLimiter(DEFAULT_RPM, DEFAULT_TPM)
+
+
+def configure(cfg: dict) -> None:
+    """Use the Gemini model and rate limits from the app config for the shared client."""
+    global _client_model
+    with _client_lock:
+        _client_model = cfg.get("gemini_model", DEFAULT_MODEL)
+    _limiter.set_limits(cfg.get("gemini_rpm", DEFAULT_RPM), cfg.get("gemini_tpm", DEFAULT_TPM))
+
+
+def current_model() -> str:
+    return _client_model
+
+
+def get_client(api_key: str) -> GeminiClient:
+    """Shared client for this process, rebuilt when the key or model changes."""
+    global _client
+    with _client_lock:
+        if _client is None or (_client.api_key, _client.model) != (api_key, _client_model):
+            if _client is not None:
+                _client.close()
+            _client = GeminiClient(api_key, _client_model, limiter=_limiter)
+        return _client
+
+
+def gemini_summarize(prompt: str, api_key: str) -> str:
+    return get_client(api_key).generate(prompt)
+
+
+def gemini_stream(prompt: str, api_key: str) -> Iterator[str]:
+    """Like gemini_summarize, but yields the response piece by piece."""
+    return get_client(api_key).generate_stream(prompt)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from studywise.config import CONFIG_DIR
+
+LLM_CACHE_PATH = os.path.join(CONFIG_DIR, "cache", "llm_responses.sqlite3")
+DEFAULT_MAX_MB = 64
+
+
+def response_key(backend: str, model: str, prompt: str, params: dict | None = None) -> str:
+    """Hash of everything that decides an LLM response."""
+    h = hashlib.sha256()
+    h.update(json.dumps([backend, model, params or {}], sort_keys=True).encode())
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
+class LlmCache:
+    """
+    LLM responses by response_key, in one SQLite file.
+    Least recently used entries are evicted once the stored responses
+    exceed `max_mb`. Use counts are kept in `hits` / `misses`.
+    Safe to share between threads. A broken or locked database only
+    turns lookups into misses; it never fails an LLM call.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_mb: int = DEFAULT_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        # Total size of stored responses, read when the database is opened
+        self._size = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._size = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._db = db
+        return self._db
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            try:
+                db = self._connect()
+                row = db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            except (sqlite3.Error, OSError):
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            try:
+                db = self._connect()
+                old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, response, size, time.time())
+                )
+                self._size += size - (old[0] if old else 0)
+                if self._size > self.max_bytes:
+                    self._evict()
+            except (sqlite3.Error, OSError):
+                pass
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under the cap. Lock held."""
+        db = self._connect()
+        doomed = []
+        rows = db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self._size -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                self._connect().execute("DELETE FROM responses")
+                self._size = 0
+            except (sqlite3.Error, OSError):
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,20 +1,165 @@
-from studywise.ai.gemini_client import gemini_summarize
-from studywise.ai.ollama_client import ollama_summarize
+from typing import Callable, Iterator
+
+from studywise.ai import gemini_client, ollama_client
+from studywise.ai.gemini_client import gemini_stream, gemini_summarize
+from studywise.ai.llm_cache import LlmCache, response_key
+from studywise.ai.ollama_client import ollama_stream, ollama_summarize
+
+# Chunks summarized at once, by backend. An Ollama server usually has
+# one GPU and queues parallel requests anyway, so Ollama runs as many
+# as its endpoints' "concurrency" settings add up to; this is the
+# fallback. Gemini serves several at a time, paced by the client's
+# rate limiter.
+CONCURRENCY = {
+    "ollama": 1,
+    "gemini": 4,
+}
+
+
+# Backends that take a whole batch of prompts at once (see summarize_many)
+BATCH_MODES = {"gemini"}
+
+
+def max_concurrency(mode: str) -> int:
+    """Default number of concurrent requests for an LLM backend."""
+    if mode == "ollama":
+        return ollama_client.get_client().concurrency
+    return CONCURRENCY.get(mode, 1)
+
+
+def model_name(mode: str) -> str:
+    """Model a backend answers with; part of the response cache key."""
+    if mode == "gemini":
+        return gemini_client.current_model()
+    if mode == "ollama":
+        return ollama_client.get_client().model_name()
+    raise ValueError(f"Invalid LLM mode: {mode}")
 
 
 def summarize(
     prompt: str,
     mode: str = "ollama",
-    gemini_key: str | None = None
+    gemini_key: str | None = None,
+    cache: LlmCache | None = None
 ) -> str:
+    """
+    Send one prompt to the selected backend. With a `cache`, a prompt
+    answered before by the same backend and model is not sent again.
+    """
+    key = None
+    if cache is not None:
+        key = response_key(mode, model_name(mode), prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
+    if mode == "gemini":
+        if not gemini_key:
+            raise RuntimeError("Gemini API key not set.")
+        output = gemini_summarize(prompt, gemini_key)
+    elif mode == "ollama":
+        output = ollama_summarize(prompt)
+    else:
+        raise ValueError(f"Invalid LLM mode: {mode}")
+
+    if cache is not None:
+        cache.put(key, output)
+    return output
+
+
+def stream(
+    prompt: str,
+    mode: str = "ollama",
+    gemini_key: str | None = None,
+    cache: LlmCache | None = None
+) -> Iterator[str]:
+    """
+    Like summarize, but yields the response as text deltas while the
+    backend generates it. A cached response comes as a single delta;
+    a response is only cached once it has streamed completely.
+    """
+    key = None
+    if cache is not None:
+        key = response_key(mode, model_name(mode), prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
 
     if mode == "gemini":
         if not gemini_key:
             raise RuntimeError("Gemini API key not set.")
-        return gemini_summarize(prompt, gemini_key)
+        deltas = gemini_stream(prompt, gemini_key)
+    elif mode == "ollama":
+        deltas = ollama_stream(prompt)
+    else:
+        raise ValueError(f"Invalid LLM mode: {mode}")
 
-    if mode == "ollama":
-        return ollama_summarize(prompt)
+    parts = []
+    for delta in deltas:
+        parts.append(delta)
+        yield delta
 
-    raise ValueError(f"Invalid LLM mode: {mode}")
+    if cache is not None:
+        cache.put(key, "".join(parts).strip())
+
+
+def summarize_many(
+    prompts: list[str],
+    mode: str = "gemini",
+    gemini_key: str | None = None,
+    cache: LlmCache | None = None,
+    max_workers: int | None = None,
+    on_delta: Callable[[int, str], None] | None = None,
+    on_retry: Callable[[int], None] | None = None,
+    on_finish: Callable[[int], None] | None = None
+) -> list[str]:
+    """
+    Answer several prompts in one go, in prompt order: cached ones from
+    `cache`, the rest concurrently on the backend's async client (up to
+    `max_workers` at a time). Only for BATCH_MODES.
+
+    With `on_delta(index, text)` responses are streamed, a cached one as
+    a single delta; `on_retry(index)` is called before a partly streamed
+    response is retried and `on_finish(index)` once a response is
+    complete. Each response is cached as soon as it completes.
+    """
+    if mode != "gemini":
+        raise ValueError(f"Batched requests are not supported for LLM mode: {mode}")
+    if not gemini_key:
+        raise RuntimeError("Gemini API key not set.")
+
+    outputs: list[str | None] = [None] * len(prompts)
+    keys = [None] * len(prompts)
+    if cache is not None:
+        model = model_name(mode)
+        for i, prompt in enumerate(prompts):
+            keys[i] = response_key(mode, model, prompt)
+            outputs[i] = cache.get(keys[i])
+
+    missing = [i for i, output in enumerate(outputs) if output is None]
+    for i, output in enumerate(outputs):
+        if output is not None:
+            if on_delta is not None:
+                on_delta(i, output)
+            if on_finish is not None:
+                on_finish(i)
+
+    def finished(j: int, answer: str) -> None:
+        if cache is not None:
+            cache.put(keys[missing[j]], answer)
+        if on_finish is not None:
+            on_finish(missing[j])
+
+    if missing:
+        client = gemini_client.get_client(gemini_key)
+        answers = client.generate_many(
+            [prompts[i] for i in missing],
+            max_workers or max_concurrency(mode),
+            (lambda j, text: on_delta(missing[j], text)) if on_delta else None,
+            (lambda j: on_retry(missing[j])) if on_retry else None,
+            finished
+        )
+        for i, answer in zip(missing, answers):
+            outputs[i] = answer
+    return outputs
@@ -1,10 +1,31 @@
+import http.client
 import subprocess
 import shutil
 import os
 import json
-import urllib.request
+import threading
+import time
+from typing import Callable, Iterator
+from urllib.parse import urlsplit
 
 DEFAULT_MODEL = "llama3"
+DEFAULT_URL = "http://127.0.0.1:11434"
+# How long the server keeps the model loaded after a request. Without it
+# the model can be unloaded between chunks and reloaded for the next one.
+DEFAULT_KEEP_ALIVE = "10m"
+# Seconds to wait for the next bytes of a response
+REQUEST_TIMEOUT = 90
+# Installed models are looked up again after this many seconds
+MODELS_TTL = 60
+DISCOVERY_TIMEOUT = 2
+# An endpoint that failed is skipped for this many seconds, then tried again
+DOWN_SECONDS = 30
+
+# Connection-level failures: the server is down, restarting or unreachable.
+# A read timeout is an OSError too, but is raised as OllamaTimeout first.
+_CONNECTION_ERRORS = (OSError, http.client.HTTPException)
+# How a pooled connection the server has closed in the meantime fails
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
 
 
 def _find_ollama_cli() -> str | None:
@@ -22,93 +43,591 @@ def _find_ollama_cli() -> str | None:
     return None
 
 
-def _ollama_http_models() -> list[str]:
-    """Return available model names via REST API, or empty list if unreachable."""
+def _cli_generate(cli: str, model: str, prompt: str) -> str:
+    """One prompt through `ollama run`, for when the HTTP API is unreachable."""
+    try:
+        result = subprocess.run(
+            [cli, "run", model],
+            input=prompt,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            capture_output=True,
+            timeout=REQUEST_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError("Ollama model timed out")
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "Ollama failed")
+
+    output = result.stdout.strip()
+    if not output:
+        raise RuntimeError("Ollama returned empty response")
+    return output
+
+
+def _cli_has_model(cli: str) -> bool:
     try:
-        with urllib.request.urlopen("http://127.0.0.1:11434/api/tags", timeout=2) as resp:
-            data = json.loads(resp.read().decode("utf-8", "replace"))
-            models = data.get("models", [])
-            names = []
-            for m in models:
-                # Recent tags API returns name like "llama3:latest"
-                name = m.get("name") or m.get("model")
-                if name:
-                    # Strip tag suffix if present
-                    names.append(str(name).split(":")[0])
-            return names
+        result = subprocess.run(
+            [cli, "list"],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            timeout=5
+        )
+        return result.returncode == 0 and bool(result.stdout.strip())
     except Exception:
-        return []
+        return False
 
 
-def ollama_has_model() -> bool:
-    """Check if any Ollama model is available via CLI or REST API."""
-    cli = _find_ollama_cli()
-    if cli:
+class EndpointUnavailable(RuntimeError):
+    """The Ollama server could not be reached, or dropped the connection."""
+
+
+class OllamaTimeout(RuntimeError):
+    """The server took longer than the client's timeout to send more of a response."""
+
+
+def _parse(body: bytes) -> dict:
+    try:
+        data = json.loads(body.decode("utf-8", "replace"))
+    except ValueError:
+        raise RuntimeError("Ollama sent an invalid response")
+    if not isinstance(data, dict):
+        raise RuntimeError("Ollama sent an invalid response")
+    return data
+
+
+class OllamaClient:
+    """
+    Talks to one Ollama server through its HTTP API (/api/generate,
+    /api/chat), reusing keep-alive connections between requests: one
+    per request in flight, so it is safe to share between threads.
+
+    Installed models are discovered once and cached for MODELS_TTL.
+    With `use_cli`, the Ollama CLI answers when the server can't be
+    reached over HTTP.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_URL,
+        model: str = DEFAULT_MODEL,
+        keep_alive: str | int = DEFAULT_KEEP_ALIVE,
+        use_cli: bool = False,
+        timeout: float = REQUEST_TIMEOUT
+    ):
+        parts = urlsplit(base_url if "//" in base_url else "http://" + base_url)
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.use_cli = use_cli
+        self.timeout = timeout
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname or "127.0.0.1"
+        self._port = parts.port or (443 if self._https else 11434)
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._models: list[str] | None = None
+        self._models_at = 0.0
+
+    # ---- connections ----
+
+    def _connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return cls(self._host, self._port, timeout=self.timeout)
+
+    def _finish(self, conn: http.client.HTTPConnection, resp, complete: bool) -> None:
+        """Return a connection to the pool once its response is fully read."""
+        if complete and not resp.will_close:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+
+    def _timeout(self) -> OllamaTimeout:
+        return OllamaTimeout(f"Ollama timeout: no response within {self.timeout:g}s")
+
+    def _request(self, method: str, path: str, payload: dict | None = None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        for attempt in range(2):
+            conn = self._connection()
+            reused = conn.sock is not None
+            try:
+                # Connects first if needed: failing here, even by timing
+                # out, means the server can't be reached
+                conn.request(method, path, body=body, headers=headers)
+            except _CONNECTION_ERRORS as e:
+                conn.close()
+                # The server may have closed an idle pooled connection
+                if reused and not attempt and isinstance(e, _STALE_ERRORS):
+                    continue
+                raise
+
+            try:
+                resp = conn.getresponse()
+            except TimeoutError:
+                conn.close()
+                # Sent, but no answer in time: the model is busy, not gone,
+                # and sending it again would run the generation twice
+                raise self._timeout()
+            except _CONNECTION_ERRORS as e:
+                conn.close()
+                # Closed before any response: a pooled connection the
+                # server dropped while idle, which never saw the request
+                if reused and not attempt and isinstance(e, _STALE_ERRORS):
+                    continue
+                raise
+
+            if resp.status >= 400:
+                detail = resp.read().decode("utf-8", "replace")
+                self._finish(conn, resp, True)
+                try:
+                    detail = json.loads(detail).get("error", detail)
+                except (ValueError, AttributeError):
+                    pass
+                raise RuntimeError(f"Ollama error: {detail or resp.status}")
+            return conn, resp
+
+    def _post(self, path: str, payload: dict) -> dict:
+        conn, resp = self._request("POST", path, payload)
+        complete = False
         try:
-            result = subprocess.run(
-                [cli, "list"],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return True
-        except Exception:
-            pass
+            data = _parse(resp.read())
+            complete = True
+        except TimeoutError:
+            raise self._timeout()
+        finally:
+            self._finish(conn, resp, complete)
+        if "error" in data:
+            raise RuntimeError(f"Ollama error: {data['error']}")
+        return data
 
-    # Fallback: REST API
-    return bool(_ollama_http_models())
+    def _post_stream(self, path: str, payload: dict) -> Iterator[dict]:
+        conn, resp = self._request("POST", path, payload)
+        complete = False
+        try:
+            # One JSON object per line, the last one has "done": true
+            for line in resp:
+                if not line.strip():
+                    continue
+                data = _parse(line)
+                if "error" in data:
+                    raise RuntimeError(f"Ollama error: {data['error']}")
+                yield data
+                if data.get("done"):
+                    break
+            # Read the end of the chunked body so the connection can be reused
+            resp.read()
+            complete = True
+        except TimeoutError:
+            raise self._timeout()
+        finally:
+            self._finish(conn, resp, complete)
 
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
 
-def ollama_summarize(prompt: str) -> str:
-    """Summarize via Ollama using CLI if available, otherwise REST API."""
-    cli = _find_ollama_cli()
-    if cli:
+    # ---- discovery ----
+
+    def models(self, refresh: bool = False) -> list[str]:
+        """Installed model names such as "llama3:latest"; empty if unreachable."""
+        with self._lock:
+            if (
+                not refresh and self._models is not None
+                and time.monotonic() - self._models_at < MODELS_TTL
+            ):
+                return self._models
+
+        # A separate short-lived connection: a host that doesn't answer
+        # should fail the check quickly, not after REQUEST_TIMEOUT
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        conn = cls(self._host, self._port, timeout=DISCOVERY_TIMEOUT)
         try:
-            result = subprocess.run(
-                [cli, "run", DEFAULT_MODEL],
-                input=prompt,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                capture_output=True,
-                timeout=90
-            )
-        except subprocess.TimeoutExpired:
-            raise RuntimeError("Ollama model timed out")
+            conn.request("GET", "/api/tags")
+            resp = conn.getresponse()
+            if resp.status >= 400:
+                return []
+            data = _parse(resp.read())
+        except (*_CONNECTION_ERRORS, RuntimeError):
+            # Not cached: the server may be started any moment
+            return []
+        finally:
+            conn.close()
 
-        if result.returncode != 0:
-            raise RuntimeError(result.stderr.strip() or "Ollama failed")
+        names = [m.get("name") or m.get("model") for m in data.get("models", [])]
+        models = [str(name) for name in names if name]
+        with self._lock:
+            self._models = models
+            self._models_at = time.monotonic()
+        return models
 
-        output = result.stdout.strip()
-        if not output:
+    def model_name(self) -> str:
+        """The configured model if installed (under any tag), else the first installed one."""
+        models = self.models()
+        if self.model in models:
+            return self.model
+        for name in models:
+            if name.split(":")[0] == self.model:
+                return name
+        return models[0] if models else self.model
+
+    def has_model(self) -> bool:
+        if self.models():
+            return True
+        cli = _find_ollama_cli() if self.use_cli else None
+        return bool(cli) and _cli_has_model(cli)
+
+    # ---- generation ----
+
+    def _payload(self, **fields) -> dict:
+        return {"model": self.model_name(), "keep_alive": self.keep_alive, **fields}
+
+    def _fallback(self, error: Exception, prompt: str | None) -> str:
+        cli = _find_ollama_cli() if self.use_cli and prompt is not None else None
+        if not cli:
+            raise EndpointUnavailable(f"Ollama REST call failed: {error}")
+        return _cli_generate(cli, self.model, prompt)
+
+    def generate(self, prompt: str) -> str:
+        try:
+            data = self._post("/api/generate", self._payload(prompt=prompt, stream=False))
+        except _CONNECTION_ERRORS as e:
+            return self._fallback(e, prompt)
+        out = data.get("response", "").strip()
+        if not out:
             raise RuntimeError("Ollama returned empty response")
-        return output
-
-    # REST fallback
-    models = _ollama_http_models()
-    model = DEFAULT_MODEL if DEFAULT_MODEL in models else (models[0] if models else DEFAULT_MODEL)
-    payload = json.dumps({
-        "model": model,
-        "prompt": prompt,
-        "stream": False,
-    }).encode("utf-8")
-    req = urllib.request.Request(
-        "http://127.0.0.1:11434/api/generate",
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=90) as resp:
-            data = json.loads(resp.read().decode("utf-8", "replace"))
-            if "error" in data:
-                raise RuntimeError(f"Ollama error: {data['error']}")
-            out = data.get("response", "").strip()
-            if not out:
-                raise RuntimeError("Ollama returned empty response")
-            return out
-    except Exception as e:
-        raise RuntimeError(f"Ollama REST call failed: {e}")
+        return out
+
+    def chat(self, messages: list[dict]) -> str:
+        """`messages` as in the API: [{"role": "user", "content": "..."}, ...]."""
+        try:
+            data = self._post("/api/chat", self._payload(messages=messages, stream=False))
+        except _CONNECTION_ERRORS as e:
+            return self._fallback(e, None)
+        out = data.get("message", {}).get("content", "").strip()
+        if not out:
+            raise RuntimeError("Ollama returned empty response")
+        return out
+
+    def _stream(
+        self,
+        path: str,
+        payload: dict,
+        text_of: Callable[[dict], str],
+        prompt: str | None
+    ) -> Iterator[str]:
+        started = False
+        try:
+            for data in self._post_stream(path, payload):
+                text = text_of(data)
+                if text:
+                    started = True
+                    yield text
+        except _CONNECTION_ERRORS as e:
+            if started:
+                raise EndpointUnavailable(f"Ollama REST call failed: {e}")
+            # The CLI can't stream to us; its whole answer is one piece
+            yield self._fallback(e, prompt)
+            return
+        if not started:
+            raise RuntimeError("Ollama returned empty response")
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Like generate, but yields the response piece by piece as it is generated."""
+        return self._stream(
+            "/api/generate",
+            self._payload(prompt=prompt, stream=True),
+            lambda data: data.get("response", ""),
+            prompt
+        )
+
+    def chat_stream(self, messages: list[dict]) -> Iterator[str]:
+        return self._stream(
+            "/api/chat",
+            self._payload(messages=messages, stream=True),
+            lambda data: data.get("message", {}).get("content", ""),
+            None
+        )
+
+
+class Endpoint:
+    """One server of an OllamaPool and the requests it is running."""
+
+    def __init__(self, client: OllamaClient, weight: float = 1, concurrency: int = 1):
+        self.client = client
+        self.weight = max(float(weight), 0.01)
+        self.concurrency = max(int(concurrency), 1)
+        self.outstanding = 0
+        self.down_until = 0.0
+
+    def is_up(self, now: float) -> bool:
+        return self.down_until <= now
+
+
+def parse_endpoints(entries: list, default_url: str = DEFAULT_URL) -> list[dict]:
+    """
+    Endpoint settings from the config: URLs, or dicts with "url" and
+    optional "weight" and "concurrency". An empty list means the one
+    server at `default_url`.
+    """
+    endpoints = []
+    for entry in entries or []:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        if isinstance(entry, dict) and entry.get("url"):
+            endpoints.append({
+                "url": entry["url"],
+                "weight": entry.get("weight", 1),
+                "concurrency": entry.get("concurrency", 1),
+            })
+    return endpoints or [{"url": default_url, "weight": 1, "concurrency": 1}]
+
+
+class OllamaPool:
+    """
+    Spreads requests over several Ollama servers running the same model.
+
+    Each request goes to the endpoint with the fewest requests in flight
+    relative to its weight, among those with a free slot (at most
+    `concurrency` requests each); with every slot taken it waits for
+    one. An endpoint that can't be reached (EndpointUnavailable) is
+    marked down for DOWN_SECONDS and the request fails over to the next
+    one; a stream only fails over before its first piece. A slow
+    response (OllamaTimeout) is neither: the endpoint is up and may
+    still be generating, so the prompt is not sent anywhere else.
+
+    `check_health` asks every endpoint for its models at once and marks
+    the silent ones down. With `use_cli`, the Ollama CLI answers when no
+    endpoint can be reached.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[dict],
+        model: str = DEFAULT_MODEL,
+        keep_alive: str | int = DEFAULT_KEEP_ALIVE,
+        use_cli: bool = False,
+        timeout: float = REQUEST_TIMEOUT
+    ):
+        self.model = model
+        self.use_cli = use_cli
+        self.endpoints = [
+            Endpoint(
+                OllamaClient(e["url"], model, keep_alive, timeout=timeout),
+                e.get("weight", 1),
+                e.get("concurrency", 1)
+            )
+            for e in endpoints
+        ]
+        self._cond = threading.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        """Requests the endpoints that are up can run at once."""
+        now = time.monotonic()
+        with self._cond:
+            up = [e for e in self.endpoints if e.is_up(now)] or self.endpoints
+            return sum(e.concurrency for e in up)
+
+    # ---- routing ----
+
+    def _acquire(self, tried: list[Endpoint]) -> Endpoint | None:
+        """Reserve a slot on the best endpoint not in `tried`; None once all were tried."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                left = [e for e in self.endpoints if e not in tried]
+                if not left:
+                    return None
+                # Endpoints that are down only get requests when nothing else is left
+                candidates = [e for e in left if e.is_up(now)] or left
+                free = [e for e in candidates if e.outstanding < e.concurrency]
+                if free:
+                    best = min(free, key=lambda e: ((e.outstanding + 1) / e.weight, -e.weight))
+                    best.outstanding += 1
+                    return best
+                # Woken when a slot frees; the timeout notices endpoints coming back up
+                self._cond.wait(timeout=1.0)
+
+    def _release(self, endpoint: Endpoint, failed: bool) -> None:
+        with self._cond:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.down_until = time.monotonic() + DOWN_SECONDS
+            else:
+                endpoint.down_until = 0.0
+            self._cond.notify_all()
+
+    def _fallback(self, error: Exception | None, prompt: str | None) -> str:
+        cli = _find_ollama_cli() if self.use_cli and prompt is not None else None
+        if not cli:
+            raise error or EndpointUnavailable("No Ollama endpoint configured")
+        return _cli_generate(cli, self.model, prompt)
+
+    def _call(self, request: Callable[[OllamaClient], str], prompt: str | None) -> str:
+        tried: list[Endpoint] = []
+        error = None
+        while (endpoint := self._acquire(tried)) is not None:
+            tried.append(endpoint)
+            failed = False
+            try:
+                return request(endpoint.client)
+            except OllamaTimeout:
+                # Slow, not down: running the prompt again elsewhere would
+                # only load a second server with it
+                raise
+            except EndpointUnavailable as e:
+                failed = True
+                error = e
+                print(f"[AI] Ollama at {endpoint.client.base_url} is unavailable ({e}), trying another endpoint...")
+            finally:
+                self._release(endpoint, failed)
+        return self._fallback(error, prompt)
+
+    def _call_stream(self, request: Callable[[OllamaClient], Iterator[str]], prompt: str | None) -> Iterator[str]:
+        tried: list[Endpoint] = []
+        error = None
+        while (endpoint := self._acquire(tried)) is not None:
+            tried.append(endpoint)
+            failed = False
+            started = False
+            try:
+                for text in request(endpoint.client):
+                    started = True
+                    yield text
+                return
+            except OllamaTimeout:
+                raise
+            except EndpointUnavailable as e:
+                failed = True
+                if started:
+                    raise
+                error = e
+                print(f"[AI] Ollama at {endpoint.client.base_url} is unavailable ({e}), trying another endpoint...")
+            finally:
+                self._release(endpoint, failed)
+        yield self._fallback(error, prompt)
+
+    # ---- discovery ----
+
+    def check_health(self) -> bool:
+        """Probe all endpoints at once; those without models are marked down. True if any is up."""
+        results: dict[int, bool] = {}
+
+        def probe(i: int, endpoint: Endpoint) -> None:
+            results[i] = bool(endpoint.client.models(refresh=True))
+
+        threads = [
+            threading.Thread(target=probe, args=(i, e), daemon=True)
+            for i, e in enumerate(self.endpoints)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        now = time.monotonic()
+        with self._cond:
+            for i, endpoint in enumerate(self.endpoints):
+                endpoint.down_until = 0.0 if results.get(i) else now + DOWN_SECONDS
+            self._cond.notify_all()
+        return any(results.values())
+
+    def _first_up(self) -> OllamaClient:
+        now = time.monotonic()
+        with self._cond:
+            up = [e for e in self.endpoints if e.is_up(now)] or self.endpoints
+            return max(up, key=lambda e: e.weight).client
+
+    def models(self) -> list[str]:
+        return self._first_up().models()
+
+    def model_name(self) -> str:
+        return self._first_up().model_name()
+
+    def has_model(self) -> bool:
+        if self.check_health():
+            return True
+        cli = _find_ollama_cli() if self.use_cli else None
+        return bool(cli) and _cli_has_model(cli)
+
+    # ---- generation ----
+
+    def generate(self, prompt: str) -> str:
+        return self._call(lambda client: client.generate(prompt), prompt)
+
+    def chat(self, messages: list[dict]) -> str:
+        return self._call(lambda client: client.chat(messages), None)
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        return self._call_stream(lambda client: client.generate_stream(prompt), prompt)
+
+    def chat_stream(self, messages: list[dict]) -> Iterator[str]:
+        return self._call_stream(lambda client: client.chat_stream(messages), None)
+
+    def close(self) -> None:
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+
+
+_client: OllamaPool | None = None
+_client_settings: dict = {"endpoints": parse_endpoints([])}
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaPool:
+    """Shared client for this process, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaPool(**_client_settings)
+        return _client
+
+
+def configure(cfg: dict) -> OllamaPool:
+    """
+    Point the shared client at the servers and model from the app config
+    ("ollama_endpoints", or the one "ollama_url" if that list is empty).
+    The client, and its open connections, are kept if nothing changed.
+    """
+    global _client, _client_settings
+    settings = {
+        "endpoints": parse_endpoints(
+            cfg.get("ollama_endpoints", []), cfg.get("ollama_url", DEFAULT_URL)
+        ),
+        "model": cfg.get("ollama_model", DEFAULT_MODEL),
+        "keep_alive": cfg.get("ollama_keep_alive", DEFAULT_KEEP_ALIVE),
+        "use_cli": cfg.get("ollama_use_cli", False),
+    }
+    with _client_lock:
+        if _client is None or settings != _client_settings:
+            if _client is not None:
+                _client.close()
+            _client = OllamaPool(**settings)
+            _client_settings = settings
+        return _client
+
+
+def ollama_has_model() -> bool:
+    """Check if any Ollama endpoint has a model (or the CLI, if enabled)."""
+    return get_client().has_model()
+
+
+def ollama_summarize(prompt: str) -> str:
+    """Summarize via the shared Ollama client."""
+    return get_client().generate(prompt)
+
+
+def ollama_stream(prompt: str) -> Iterator[str]:
+    """Like ollama_summarize, but yields the response piece by piece."""
+    return get_client().generate_stream(prompt)
@@ -0,0 +1,113 @@
+import asyncio
+import random
+import threading
+import time
+
+# Share of a per-minute budget that may be spent at once. The rest
+# refills evenly, so no 60 s window ever sees more than the budget:
+# a full bucket plus a minute of refill is exactly one budget.
+BURST_SHARE = 0.1
+# Waits are stretched by up to this share (of a retry backoff, or of one
+# request's refill interval for the rate limiter), so requests held
+# back together don't all go out in the same instant
+DEFAULT_JITTER = 0.2
+# Refill interval to jitter by when there is no requests-per-minute budget
+UNLIMITED_INTERVAL = 1.0
+
+
+def jittered(seconds: float, jitter: float = DEFAULT_JITTER) -> float:
+    return seconds * (1 + random.uniform(0, jitter)) if seconds > 0 else 0.0
+
+
+class TokenBucket:
+    """
+    `per_minute` units a minute, refilled continuously. Reservations
+    may overdraw the bucket; the next ones then wait for it to refill.
+    A budget of 0 means no limit.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute * (1 - BURST_SHARE) / 60
+        self.capacity = per_minute * BURST_SHARE
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` and return the seconds until it is covered."""
+        if not self.rate:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def drain(self) -> None:
+        """Drop any saved-up burst, e.g. after the server said slow down."""
+        self.level = min(self.level, 0.0)
+
+
+class RateLimiter:
+    """
+    Paces requests to a requests-per-minute and a tokens-per-minute
+    budget, both token buckets. `pause` holds every request back, e.g.
+    for a server's retry-after hint. Waits are reserved in call order,
+    so concurrent callers are let through one after another rather
+    than all at once. Safe to share between threads and event loops.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, jitter: float = DEFAULT_JITTER):
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.limits: tuple[float, float] | None = None
+        self.set_limits(rpm, tpm)
+
+    def set_limits(self, rpm: float, tpm: float) -> None:
+        """Change the budgets. Setting the same ones again keeps what is used up."""
+        with self._lock:
+            if self.limits == (rpm, tpm):
+                return
+            self.limits = (rpm, tpm)
+            self._requests = TokenBucket(rpm)
+            self._tokens = TokenBucket(tpm)
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                self._requests.reserve(1, now),
+                self._tokens.reserve(tokens, now),
+                self._paused_until - now
+            )
+            rpm = self.limits[0]
+        if delay <= 0:
+            return 0.0
+        # Spread by a share of the time one request takes to refill, not
+        # of the whole wait: a long wait (a big prompt, a retry-after)
+        # needs no more spread, and scaled jitter would waste budget
+        interval = 60 / rpm if rpm else UNLIMITED_INTERVAL
+        return delay + random.uniform(0, self.jitter * interval)
+
+    def charge(self, tokens: int) -> None:
+        """Count tokens only known after the request, such as the response's."""
+        with self._lock:
+            self._tokens.reserve(tokens, time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests for at least `seconds` from now."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._requests.drain()
+            self._tokens.drain()
+
+    def wait(self, tokens: int = 0) -> None:
+        """Block until a request of `tokens` fits the budget."""
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def wait_async(self, tokens: int = 0) -> None:
+        """Like wait, without blocking the event loop."""
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
@@ -1,26 +1,115 @@
-from studywise.ai.llm_router import summarize as llm_summarize
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from studywise.ai.gemini_client import QuotaExceeded
+from studywise.ai.llm_cache import LlmCache
+from studywise.ai.llm_router import (
+    BATCH_MODES, max_concurrency, stream as llm_stream,
+    summarize as llm_summarize, summarize_many as llm_summarize_many
+)
+from studywise.ai.ollama_client import OllamaTimeout
+from studywise.ai.rate_limiter import jittered
+from studywise.ai.tokens import CHARS_PER_TOKEN, CHUNK_TOKENS, chunk_tokens, estimate_tokens
+
+FILE_MARKER = "===== FILE:"
+# End of a sentence, with any closing quote or bracket and the space after
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+# Tries per chunk before summarize_text gives up
+CHUNK_ATTEMPTS = 3
+
+
+def _find_cut(text: str, start: int, end: int) -> int:
+    """
+    Where a chunk running from `start` to at most `end` should stop:
+    the last paragraph break in the second half of that window, else the
+    last sentence end or line break there, else the last space.
+    """
+    low = start + (end - start) // 2
+    cut = text.rfind("\n\n", low, end)
+    if cut >= 0:
+        return cut + 2
+
+    last = None
+    for last in _SENTENCE_END.finditer(text, low, end):
+        pass
+    if last:
+        return last.end()
 
+    cut = text.rfind("\n", low, end)
+    if cut < 0:
+        cut = text.rfind(" ", start + 1, end)
+    return cut + 1 if cut >= 0 else end
 
-def chunk_text(text: str, max_chars: int = 3500) -> list[str]:
+
+def _overlap_start(text: str, start: int, cut: int, overlap: int) -> int:
+    """
+    Start of the last `overlap` chars before `cut`, moved up to a
+    sentence or word; always after `start`, so chunking moves on.
+    """
+    low = max(cut - overlap, start + 1)
+    m = _SENTENCE_END.search(text, low, cut)
+    if m and m.end() < cut:
+        return m.end()
+    space = text.find(" ", low, cut)
+    overlap_start = space + 1 if space >= 0 else low
+    return overlap_start if overlap_start > start else cut
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = CHUNK_TOKENS["ollama"],
+    overlap_tokens: int = 0
+) -> list[str]:
     """
-    Splits text by FILE boundaries first, then by size.
-    This prevents mixing multiple documents.
+    Splits text by FILE boundaries first, then into chunks of at most
+    `max_tokens` estimated tokens. This prevents mixing multiple documents.
+
+    Oversized files are cut at paragraph breaks where possible, else at
+    sentence ends, line breaks or spaces. Every chunk of a file starts
+    with its FILE line, and continuation chunks repeat the last
+    `overlap_tokens` of the chunk before. Runs in linear time.
     """
+    max_chars = max(1, max_tokens) * CHARS_PER_TOKEN
     chunks = []
 
-    for block in text.split("===== FILE:"):
+    for i, block in enumerate(text.split(FILE_MARKER)):
         block = block.strip()
         if not block:
             continue
-
-        block = "===== FILE:" + block
+        if i:
+            block = f"{FILE_MARKER} {block}"
 
         if len(block) <= max_chars:
             chunks.append(block)
-        else:
-            # If a single file is too large, chunk it internally
-            for i in range(0, len(block), max_chars):
-                chunks.append(block[i:i + max_chars])
+            continue
+
+        # If a single file is too large, chunk it internally
+        header, body = "", block
+        if i:
+            header, _, body = block.partition("\n")
+            header += "\n\n"
+            body = body.strip()
+
+        room = max(1, max_chars - len(header))
+        overlap = min(overlap_tokens * CHARS_PER_TOKEN, room // 4)
+        start = 0
+        while start < len(body):
+            end = start + room
+            cut = len(body) if end >= len(body) else _find_cut(body, start, end)
+            piece = body[start:cut].strip()
+            if piece:
+                chunks.append(header + piece)
+            if cut >= len(body):
+                break
+            # A chunk cut short (by a very long word) gets no overlap, so
+            # every chunk still moves on by at least a quarter window
+            if overlap and cut - start >= room // 2:
+                start = _overlap_start(body, start, cut, overlap)
+            else:
+                start = cut
 
     return chunks
 
@@ -99,52 +188,343 @@ CONTENT:
 
 
 
+def build_merge_prompt(notes: str) -> str:
+    return f"""
+You are a study assistant.
+
+IMPORTANT RULES (STRICT):
+- DO NOT show your thinking, analysis, or reasoning.
+- DO NOT apologize.
+- OUTPUT ONLY the final study notes.
+
+The notes below were written separately for consecutive parts of ONE
+document. Merge them into a single set of study notes.
+
+TASK:
+- Keep every distinct fact, definition and formula.
+- Remove repeated points.
+- Group related points under shared headings.
+- Use the filename as the top heading.
+
+STYLE:
+- Clear headings
+- Bullet points
+- Short factual lines
+
+NOTES:
+{notes}
+"""
+
+
+def _complete(
+    prompt: str,
+    mode: str,
+    gemini_key: str | None,
+    cache: LlmCache | None = None,
+    attempts: int = CHUNK_ATTEMPTS,
+    on_delta: Callable[[str], None] | None = None,
+    on_retry: Callable[[], None] | None = None
+) -> str:
+    """
+    One LLM call, retried on failure; see llm_router.summarize.
+    With `on_delta` the response is streamed and passed on as it
+    arrives; `on_retry` is called before a retry starts a new stream.
+    """
+    for attempt in range(attempts):
+        try:
+            if on_delta is None:
+                return llm_summarize(
+                    prompt=prompt,
+                    mode=mode,
+                    gemini_key=gemini_key,
+                    cache=cache
+                )
+
+            parts = []
+            for delta in llm_stream(prompt, mode, gemini_key, cache):
+                parts.append(delta)
+                on_delta(delta)
+            return "".join(parts).strip()
+        except (ValueError, QuotaExceeded, OllamaTimeout):
+            # Invalid mode, the client already waited out the rate limit
+            # as long as it should, or the server is too slow for the
+            # timeout: retrying cannot help, it would only send the same
+            # long prompt to a busy server again
+            raise
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            wait_time = jittered(2 ** attempt)
+            print(f"[AI] Request failed ({e}). Retrying in {wait_time:.1f}s...")
+            time.sleep(wait_time)
+            if on_retry is not None:
+                on_retry()
+
+
+class _OrderedRelay:
+    """
+    Passes on text deltas of `count` responses streamed side by side as
+    if they had been streamed one after another, separated by blank
+    lines: deltas of the earliest unfinished response go straight
+    through, later ones wait their turn.
+    """
+
+    def __init__(
+        self,
+        on_delta: Callable[[str], None],
+        count: int,
+        on_retract: Callable[[str], None] | None = None
+    ):
+        self.on_delta = on_delta
+        self.on_retract = on_retract
+        self.count = count
+        self._lock = threading.Lock()
+        self._head = 0
+        self._held: dict[int, list[str]] = {}
+        self._finished: set[int] = set()
+        # What has gone out of the earliest unfinished response so far
+        self._sent: list[str] = []
+
+    def delta(self, index: int, text: str) -> None:
+        with self._lock:
+            if index == self._head:
+                self._sent.append(text)
+                self.on_delta(text)
+            else:
+                self._held.setdefault(index, []).append(text)
+
+    def restart(self, index: int) -> None:
+        """
+        Forget the deltas of a response that is being retried: held ones
+        are dropped, ones already passed on are taken back via on_retract.
+        """
+        with self._lock:
+            self._held.pop(index, None)
+            if index == self._head and self._sent:
+                if self.on_retract is not None:
+                    self.on_retract("".join(self._sent))
+                self._sent = []
+
+    def finish(self, index: int) -> None:
+        with self._lock:
+            self._finished.add(index)
+            while self._head in self._finished:
+                self._head += 1
+                if self._head >= self.count:
+                    break
+                self._sent = self._held.pop(self._head, [])
+                self.on_delta("\n\n" + "".join(self._sent))
+
+
+def _complete_all(
+    prompts: list[str],
+    mode: str,
+    gemini_key: str | None,
+    max_workers: int | None = None,
+    cache: LlmCache | None = None,
+    label: str = "Summarizing chunk",
+    on_delta: Callable[[str], None] | None = None,
+    on_retract: Callable[[str], None] | None = None
+) -> list[str]:
+    """
+    Run several prompts, up to `max_workers` at once (by default the
+    backend's limit, see llm_router.max_concurrency). Each prompt is
+    retried on its own; outputs come back in prompt order.
+    With `on_delta`, responses are streamed to it in prompt order,
+    separated by blank lines; when a response that was partly streamed
+    is retried, the text already passed on is given to `on_retract`.
+    """
+    workers = min(len(prompts), max_workers or max_concurrency(mode))
+    relay = _OrderedRelay(on_delta, len(prompts), on_retract) if on_delta else None
+
+    def run(index: int, prompt: str) -> str:
+        if relay is None:
+            return _complete(prompt, mode, gemini_key, cache)
+
+        output = _complete(
+            prompt, mode, gemini_key, cache,
+            on_delta=lambda text: relay.delta(index, text),
+            on_retry=lambda: relay.restart(index)
+        )
+        relay.finish(index)
+        return output
+
+    if mode in BATCH_MODES:
+        # The backend runs the batch, streamed or not, on its own async
+        # client, which also waits out its retries without a thread
+        print(f"[AI] {label} 1-{len(prompts)}, {workers} at a time...")
+        if relay is None:
+            return llm_summarize_many(prompts, mode, gemini_key, cache, workers)
+        return llm_summarize_many(
+            prompts, mode, gemini_key, cache, workers,
+            on_delta=relay.delta, on_retry=relay.restart, on_finish=relay.finish
+        )
+
+    if workers <= 1:
+        outputs = []
+        for i, prompt in enumerate(prompts, start=1):
+            print(f"[AI] {label} {i}/{len(prompts)}...")
+            outputs.append(run(i - 1, prompt))
+        return outputs
+
+    print(f"[AI] {label} 1-{len(prompts)}, {workers} at a time...")
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(run, i, p) for i, p in enumerate(prompts)]
+        return [future.result() for future in futures]
+    finally:
+        # On failure, drop the prompts that have not started yet
+        pool.shutdown(cancel_futures=True)
+
+
+def _sections(notes: list[str], max_tokens: int) -> list[list[str]]:
+    """
+    Group consecutive notes into sections of at most `max_tokens`, with
+    at least two notes per section so every merge level shrinks.
+    """
+    sections: list[list[str]] = []
+    size = 0
+    for note in notes:
+        tokens = estimate_tokens(note)
+        if sections and (len(sections[-1]) < 2 or size + tokens <= max_tokens):
+            sections[-1].append(note)
+            size += tokens
+        else:
+            sections.append([note])
+            size = tokens
+    return sections
+
+
+def merge_summaries(
+    files: list[tuple[str, list[str]]],
+    mode: str = "ollama",
+    gemini_key: str | None = None,
+    max_tokens: int | None = None,
+    max_workers: int | None = None,
+    cache: LlmCache | None = None
+) -> list[str]:
+    """
+    Reduce each file's chunk summaries to one set of notes.
+
+    `files` holds (FILE line, summaries) pairs. Consecutive summaries are
+    merged in sections of up to `max_tokens`, level after level, until
+    one remains per file; the sections of all files at one level are
+    merged concurrently. With a `cache`, a re-run only recomputes the
+    sections whose input changed.
+    """
+    budget = max_tokens or chunk_tokens(mode)
+    levels = [list(notes) for _, notes in files]
+    level = 0
+
+    while any(len(notes) > 1 for notes in levels):
+        level += 1
+        jobs = []      # (file index, section) needing a merge
+        grouped = []
+        for f, notes in enumerate(levels):
+            sections = _sections(notes, budget) if len(notes) > 1 else [notes]
+            grouped.append(sections)
+            for section in sections:
+                if len(section) > 1:
+                    jobs.append((f, section))
+
+        prompts = [
+            build_merge_prompt(files[f][0] + "\n\n" + "\n\n".join(section))
+            for f, section in jobs
+        ]
+        merged = iter(_complete_all(
+            prompts, mode, gemini_key, max_workers, cache, label=f"Merging level {level} section"
+        ))
+        levels = [
+            [strip_thinking(next(merged)) if len(section) > 1 else section[0] for section in sections]
+            for sections in grouped
+        ]
+
+    return [notes[0] if notes else "" for notes in levels]
+
+
+def _by_file(chunks: list[str], summaries: list[str]) -> list[tuple[str, list[str]]]:
+    """Group chunk summaries by the FILE line their chunk starts with."""
+    files: list[tuple[str, list[str]]] = []
+    for chunk, summary in zip(chunks, summaries):
+        header = chunk.partition("\n")[0] if chunk.startswith(FILE_MARKER) else ""
+        if files and files[-1][0] == header:
+            files[-1][1].append(summary)
+        else:
+            files.append((header, [summary]))
+    return files
+
+
 def summarize_text(
     text: str,
     mode: str = "ollama",        # "ollama" or "gemini"
-    gemini_key: str | None = None
+    gemini_key: str | None = None,
+    max_tokens: int | None = None,
+    overlap_tokens: int = 0,
+    max_workers: int | None = None,
+    merge: bool = False,
+    cache: LlmCache | None = None,
+    on_delta: Callable[[str], None] | None = None,
+    on_retract: Callable[[str], None] | None = None
 ) -> str:
     """
     Summarizes text using the selected LLM backend.
-    Chunking is handled automatically.
-    """
+    Chunking is handled automatically; chunks hold up to `max_tokens`
+    estimated tokens, by default the backend's budget (see ai/tokens).
 
-    chunks = chunk_text(text)
-    summaries = []
+    Up to `max_workers` chunks are summarized at once, by default the
+    backend's limit (see llm_router.max_concurrency). Summaries are
+    joined in chunk order, so the result is the same either way.
 
-    for i, chunk in enumerate(chunks, start=1):
-        print(f"[AI] Summarizing chunk {i}/{len(chunks)}...")
+    With `merge`, the summaries of each file are then reduced to one set
+    of notes (see merge_summaries) instead of being concatenated.
+    LLM responses are reused from `cache` when given.
 
-        prompt = build_prompt(chunk)
-        summary = llm_summarize(
-            prompt=prompt,
-            mode=mode,
-            gemini_key=gemini_key
-        )
+    With `on_delta`, chunk summaries are streamed to it as they are
+    generated, in chunk order, as a preview of the final notes. If a
+    chunk is retried after part of it was streamed, that part is passed
+    to `on_retract`, to be removed from the end of the preview.
+    """
 
-        summary = strip_thinking(summary)
-        summaries.append(summary)
+    budget = max_tokens or chunk_tokens(mode)
+    chunks = chunk_text(text, budget, overlap_tokens)
+    summaries = [
+        strip_thinking(output)
+        for output in _complete_all(
+            [build_prompt(chunk) for chunk in chunks], mode, gemini_key, max_workers, cache,
+            on_delta=on_delta, on_retract=on_retract
+        )
+    ]
+    if not merge:
+        return "\n\n".join(summaries)
 
+    files = _by_file(chunks, summaries)
+    return "\n\n".join(merge_summaries(files, mode, gemini_key, budget, max_workers, cache))
 
-    return "\n\n".join(summaries)
 
 def generate_flashcards(
     notes: str,
     mode: str = "ollama",
-    gemini_key: str | None = None
+    gemini_key: str | None = None,
+    max_tokens: int | None = None,
+    max_workers: int | None = None,
+    cache: LlmCache | None = None
 ) -> list[tuple[str, str]]:
-    prompt = build_flashcard_prompt(notes)
-
-    raw = llm_summarize(
-        prompt=prompt,
-        mode=mode,
-        gemini_key=gemini_key
+    """
+    Flashcards for the notes. Notes longer than `max_tokens` (by default
+    the backend's budget) are split and carded part by part, so no
+    prompt outgrows the model's context.
+    """
+    parts = chunk_text(notes, max_tokens or chunk_tokens(mode))
+    outputs = _complete_all(
+        [build_flashcard_prompt(part) for part in parts],
+        mode, gemini_key, max_workers, cache, label="Generating flashcards for part"
     )
 
     cards = []
     q = None
 
-    for line in raw.splitlines():
+    for line in "\n".join(outputs).splitlines():
         line = line.strip()
         if line.startswith("Q:"):
             q = line[2:].strip()
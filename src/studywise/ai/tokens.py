@@ -0,0 +1,22 @@
+# English prose averages about four characters per token for the
+# BPE tokenizers used by llama3 and Gemini
+CHARS_PER_TOKEN = 4
+
+# Source tokens per summarize call, by backend. The rest of the model's
+# context holds the prompt template and the notes it writes: Ollama
+# runs llama3 with a 2048-4096 token window by default, Gemini Flash has
+# far more room but long inputs get summarized too coarsely.
+CHUNK_TOKENS = {
+    "ollama": 1024,
+    "gemini": 6000,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of `text`, without loading a tokenizer."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def chunk_tokens(mode: str) -> int:
+    """Default chunk budget for an LLM backend."""
+    return CHUNK_TOKENS.get(mode, CHUNK_TOKENS["ollama"])
@@ -0,0 +1,107 @@
+import math
+import re
+from typing import NamedTuple
+
+from studywise.ai.tokens import estimate_tokens
+from studywise.text_markers import PAGE_BREAK
+
+FILE_MARKER = "===== FILE:"
+
+# Non-blank lines at the top and at the bottom of each page to look at
+EDGE_LINES = 3
+# Shorter documents have too few pages to tell a header from content
+MIN_PAGES = 3
+# Share of a file's pages an edge line must appear on to be boilerplate
+DEFAULT_THRESHOLD = 0.5
+
+_DIGITS = re.compile(r"\d+")
+_TOKENS = re.compile(r"\w+")
+# Words that may stand next to the numbers of a page-number line
+PAGE_WORDS = {"page", "p", "pg", "of", "slide", "seite", "von", "sheet"}
+
+
+class BoilerplateResult(NamedTuple):
+    text: str
+    chars_removed: int
+    lines_removed: int
+    tokens_saved: int
+
+
+def line_key(line: str) -> str:
+    """
+    Form under which repeated lines are counted. Page-number lines, made
+    only of numbers and PAGE_WORDS, ignore the numbers, case and
+    punctuation, so "Page 3 of 20", "page 4 of 20" and bare page numbers
+    count as the same line. Any other line must repeat exactly (up to
+    spacing): "Exercise 3" and "Exercise 4" are content, not a header.
+    """
+    tokens = _TOKENS.findall(line.lower())
+    if tokens and any(t.isdigit() for t in tokens) and all(
+        t.isdigit() or t in PAGE_WORDS for t in tokens
+    ):
+        return " ".join(_DIGITS.sub("#", t) for t in tokens)
+    return " ".join(line.split())
+
+
+def _edge_lines(lines: list[str]) -> list[int]:
+    """
+    Indexes of the first and last EDGE_LINES non-blank lines; fewer on
+    short pages, so at least a third of a page is never a candidate.
+    """
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    n = min(EDGE_LINES, len(filled) // 3)
+    if not n:
+        return []
+    return filled[:n] + filled[-n:]
+
+
+def _strip_block(block: str, threshold: float, removed: list[str]) -> str:
+    pages = [page.split("\n") for page in block.split(PAGE_BREAK)]
+    if len(pages) < MIN_PAGES:
+        return block
+
+    # Frequency index: on how many pages each edge line occurs
+    edges = [_edge_lines(lines) for lines in pages]
+    counts: dict[str, int] = {}
+    for lines, indexes in zip(pages, edges):
+        for key in {line_key(lines[i]) for i in indexes}:
+            if key:
+                counts[key] = counts.get(key, 0) + 1
+
+    needed = max(MIN_PAGES, math.ceil(threshold * len(pages)))
+    repeated = {key for key, count in counts.items() if count >= needed}
+    if not repeated:
+        return block
+
+    out = []
+    for lines, indexes in zip(pages, edges):
+        drop = {i for i in indexes if line_key(lines[i]) in repeated}
+        removed.extend(lines[i].strip() for i in drop)
+        out.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+    return PAGE_BREAK.join(out)
+
+
+def strip_boilerplate(text: str, threshold: float = DEFAULT_THRESHOLD) -> BoilerplateResult:
+    """
+    Remove running headers, footers and page numbers from PDF text.
+
+    Lines near the top or bottom of a page that recur on at least
+    `threshold` of a file's pages are dropped wherever they sit in that
+    edge area. Pages are told apart by PAGE_BREAK, so only PDF text is
+    affected; each ===== FILE: block is indexed on its own.
+    """
+    out = []
+    removed: list[str] = []
+
+    for i, block in enumerate(text.split(FILE_MARKER)):
+        if i:
+            header, _, block = block.partition("\n")
+            out.append(FILE_MARKER + header + "\n")
+        out.append(_strip_block(block, threshold, removed))
+
+    return BoilerplateResult(
+        "".join(out),
+        sum(len(line) for line in removed),
+        len(removed),
+        estimate_tokens("\n".join(removed)),
+    )
@@ -0,0 +1,157 @@
+import re
+from typing import NamedTuple
+
+FILE_MARKER = "===== FILE:"
+
+# Sentence ends. Paragraph breaks are not boundaries: PDFs, DOCX files
+# and slides separate the same paragraphs differently.
+_BOUNDARY = re.compile(r"[.!?](?=\s)")
+_WORD = re.compile(r"\w+")
+
+# Spans are groups of sentences of roughly this many word characters
+MIN_SPAN_CHARS = 200
+MAX_SPAN_CHARS = 1200
+# Word n-grams compared between spans
+SHINGLE_WORDS = 3
+# Smallest shingle hashes kept per span (bottom-k MinHash)
+SKETCH_SIZE = 32
+# Estimated Jaccard similarity above which a span counts as a repeat
+DEFAULT_THRESHOLD = 0.8
+
+
+class DedupeResult(NamedTuple):
+    text: str
+    chars_skipped: int
+    spans_skipped: int
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def _sentences(block: str) -> list[tuple[int, int]]:
+    """(start, end) of each sentence of a block."""
+    out = []
+    start = 0
+    for m in _BOUNDARY.finditer(block):
+        end = m.end()
+        out.append((start, end))
+        start = end
+    if start < len(block):
+        out.append((start, len(block)))
+    return out
+
+
+def split_spans(block: str) -> list[tuple[int, int]]:
+    """
+    Cut a block into spans of whole sentences, as (start, end) offsets.
+
+    Span boundaries are content-defined: after MIN_SPAN_CHARS word
+    characters a span ends at a sentence whose words hash to 0 mod 4.
+    Only words count, never whitespace, so the same passage splits the
+    same way in a PDF and a DOCX copy, whatever comes before it and
+    however its lines and paragraphs are separated.
+    """
+    spans = []
+    span_start = 0
+    length = 0
+    for start, end in _sentences(block):
+        words = _words(block[start:end])
+        length += sum(len(w) for w in words)
+        if length < MIN_SPAN_CHARS:
+            continue
+        anchor = hash(tuple(words)) % 4 == 0
+        if anchor or length >= MAX_SPAN_CHARS:
+            spans.append((span_start, end))
+            span_start = end
+            length = 0
+    if span_start < len(block):
+        spans.append((span_start, len(block)))
+    return spans
+
+
+def sketch(text: str) -> tuple[int, ...]:
+    """Bottom-k MinHash sketch of the text's word shingles."""
+    words = _words(text)
+    n = SHINGLE_WORDS
+    if len(words) < n:
+        return ()
+    shingles = {hash(tuple(words[i:i + n])) for i in range(len(words) - n + 1)}
+    return tuple(sorted(shingles)[:SKETCH_SIZE])
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two sketches."""
+    if not a or not b:
+        return 0.0
+    sa, sb = set(a), set(b)
+    union = sorted(sa | sb)[:SKETCH_SIZE]
+    return sum(1 for h in union if h in sa and h in sb) / len(union)
+
+
+class SketchIndex:
+    """Finds earlier sketches similar to a new one via their shared minima."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._sketches: list[tuple[int, ...]] = []
+        self._by_hash: dict[int, list[int]] = {}
+
+    def find(self, s: tuple[int, ...]) -> int | None:
+        """Index of an earlier near-duplicate of `s`, or None."""
+        counts: dict[int, int] = {}
+        for h in s:
+            for i in self._by_hash.get(h, ()):
+                counts[i] = counts.get(i, 0) + 1
+
+        # A match needs most minima in common; only check plausible ones
+        needed = self.threshold * min(len(s), SKETCH_SIZE) / 2
+        for i, shared in sorted(counts.items(), key=lambda kv: -kv[1]):
+            if shared < needed:
+                break
+            if similarity(s, self._sketches[i]) >= self.threshold:
+                return i
+        return None
+
+    def add(self, s: tuple[int, ...]) -> int:
+        i = len(self._sketches)
+        self._sketches.append(s)
+        for h in s:
+            self._by_hash.setdefault(h, []).append(i)
+        return i
+
+
+def remove_near_duplicates(text: str, threshold: float = DEFAULT_THRESHOLD) -> DedupeResult:
+    """
+    Drop spans that repeat earlier content, within a file or across files.
+
+    The text is processed per ===== FILE: block so separators survive.
+    Spans too short to fingerprint (headings, stray lines) are always kept.
+    """
+    index = SketchIndex(threshold)
+    out = []
+    skipped_chars = 0
+    skipped_spans = 0
+
+    for i, block in enumerate(text.split(FILE_MARKER)):
+        if i:
+            # Keep the marker and the rest of its line untouched
+            header, _, block = block.partition("\n")
+            out.append(FILE_MARKER + header + "\n")
+
+        for start, end in split_spans(block):
+            span = block[start:end]
+            s = sketch(span)
+            if len(s) < SKETCH_SIZE // 2:
+                out.append(span)
+                continue
+            if index.find(s) is not None:
+                skipped_chars += len(span.strip())
+                skipped_spans += 1
+                # Keep the line or paragraph break the span started with
+                out.append(span[:len(span) - len(span.lstrip())])
+                continue
+            index.add(s)
+            out.append(span)
+
+    return DedupeResult("".join(out), skipped_chars, skipped_spans)
@@ -1,17 +1,100 @@
 import re
+from typing import Iterable, Iterator
 
-def clean_text(text: str) -> str:
-    # Remove broken encoding artifacts
-    text = text.replace("ï¿½", "")
-    text = text.replace("â€“", "-")
-    text = text.replace("â€™", "'")
+FILE_MARKER = "===== FILE:"
+
+# Stray characters and UTF-8-read-as-cp1252 artifacts, fixed in one
+# regex pass. str.translate with a dict table is several times slower on
+# non-ASCII text, and these rarely occur, so only matches pay for a lookup.
+_FIXES = {
+    "\ufffd": "",      # replacement character
+    "\ufeff": "",      # byte order mark
+    "\u200b": "",      # zero-width space
+    "\u00ad": "",      # soft hyphen
+    "\r": "\n",        # (CRLF is folded in TextCleaner.feed)
+    "\x0b": "\n",
+    "\x0c": "\n",      # form feed between OCR'd pages
+    "\u2028": "\n",    # line separator
+    "\u2029": "\n\n",  # paragraph separator
+    "ï¿½": "",
+    "â€“": "-",
+    "â€”": "-",
+    "â€™": "'",
+    "â€˜": "'",
+    "â€œ": '"',
+    "â€\x9d": '"',
+    "â€¦": "...",
+    "â€¢": "•",
+    "Â\xa0": " ",
+}
+_FIXES_RE = re.compile("|".join(map(re.escape, sorted(_FIXES, key=len, reverse=True))))
+
+
+def _fix_encoding(text: str) -> str:
+    return _FIXES_RE.sub(lambda m: _FIXES[m.group()], text)
+
+
+class TextCleaner:
+    """
+    Incremental cleaner: feed() text in pieces of any size and get back
+    the cleaned text for every complete line seen so far; finish()
+    flushes the rest.
+
+    Whitespace inside a line collapses to single spaces, line breaks are
+    kept, and any run of blank lines becomes one paragraph break.
+    FILE separators always stand alone between paragraph breaks.
+    """
 
-    # Normalize spacing
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"\n\s*\n", "\n\n", text)
+    def __init__(self):
+        self._partial = ""
+        self._started = False
+        self._paragraph_break = False
 
+    def feed(self, piece: str) -> str:
+        # Fold CRLF first so a pair split across pieces is seen whole;
+        # a trailing CR stays in the partial line until the next piece
+        text = (self._partial + piece).replace("\r\n", "\n")
+        cut = text.rfind("\n")
+        if cut < 0:
+            self._partial = text
+            return ""
+        self._partial = text[cut + 1:]
+        return self._emit(text[:cut])
 
-    # Restore newlines around file separators
-    text = text.replace("=====", "\n\n=====\n\n")
+    def finish(self) -> str:
+        text, self._partial = self._partial, ""
+        return self._emit(text)
 
-    return text.strip()
+    def _emit(self, text: str) -> str:
+        out = []
+        for line in _fix_encoding(text).split("\n"):
+            words = line.split()
+            if not words:
+                self._paragraph_break = self._started
+                continue
+
+            line = " ".join(words)
+            separator = line.startswith(FILE_MARKER)
+            if self._started:
+                out.append("\n\n" if self._paragraph_break or separator else "\n")
+            out.append(line)
+            self._started = True
+            self._paragraph_break = separator
+        return "".join(out)
+
+
+def clean_stream(pieces: Iterable[str]) -> Iterator[str]:
+    """Clean text as it arrives, e.g. page by page from the extractors."""
+    cleaner = TextCleaner()
+    for piece in pieces:
+        out = cleaner.feed(piece)
+        if out:
+            yield out
+    out = cleaner.finish()
+    if out:
+        yield out
+
+
+def clean_text(text: str) -> str:
+    cleaner = TextCleaner()
+    return cleaner.feed(text) + cleaner.finish()
@@ -6,7 +6,53 @@ CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
 
 DEFAULT_CONFIG = {
     "llm_mode": "ollama",   # "ollama" or "gemini"
-    "gemini_api_key": ""
+    "gemini_api_key": "",
+    "gemini_model": "gemini-2.0-flash",
+    # Gemini requests and tokens per minute (free tier); 0 = no limit
+    "gemini_rpm": 15,
+    "gemini_tpm": 1000000,
+    # Ollama server; the model is kept loaded for ollama_keep_alive
+    # between requests. The CLI is only tried when ollama_use_cli is on.
+    "ollama_url": "http://127.0.0.1:11434",
+    "ollama_model": "llama3",
+    "ollama_keep_alive": "10m",
+    "ollama_use_cli": False,
+    # Several Ollama servers to spread chunks over, replacing ollama_url:
+    # [{"url": "http://gpu1:11434", "weight": 2, "concurrency": 2}, ...]
+    # weight and concurrency (requests at once) default to 1
+    "ollama_endpoints": [],
+    "ocr_workers": 0,       # OCR processes for scanned PDFs, 0 = one per core
+    "extract_cache": True,  # reuse extracted text of unchanged files
+    "extract_cache_mb": 512,
+    "extract_workers": 4,   # files extracted at once, 1 = one after another
+    "extract_memory_mb": 256,
+    # Photo preprocessing before OCR
+    "ocr_max_megapixels": 8.0,
+    "ocr_target_dpi": 300,
+    "ocr_grayscale": True,
+    "ocr_binarize": False,
+    "ocr_crop_margins": True,
+    # Scanned PDF pages: OCR at ocr_draft_dpi first, re-render at ocr_dpi
+    # only when mean word confidence is below ocr_min_confidence
+    "ocr_dpi": 300,
+    "ocr_adaptive": True,
+    "ocr_draft_dpi": 200,
+    "ocr_min_confidence": 75.0,
+    # Keep OCR text of scanned pages across runs (repeated slides are
+    # always OCR'd once per run)
+    "ocr_page_cache_persist": False,
+    "dedupe": True,         # skip content repeated across queued files
+    "strip_boilerplate": True,  # drop headers, footers and page numbers
+    # Text per summarize call, in estimated tokens; 0 = backend default
+    "chunk_tokens": 0,
+    "chunk_overlap_tokens": 0,
+    "llm_concurrency": 0,   # chunks summarized at once, 0 = backend default
+    # Merge each file's chunk summaries into one set of notes, level by level
+    "summary_merge": True,
+    # Reuse LLM responses to prompts sent before; off = always ask the model
+    "llm_cache": True,
+    "llm_cache_mb": 64,
+    "stream_notes": True    # show notes in the UI while they are generated
 }
 
 def load_config():
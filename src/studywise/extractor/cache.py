@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+
+from studywise.config import CONFIG_DIR
+
+# Bump whenever extractor output changes so old entries stop matching
+EXTRACTOR_VERSION = 8
+
+CACHE_DIR = os.path.join(CONFIG_DIR, "cache", "extract")
+# OCR text of individual rendered pages, see pdf_extractor.page_image_key
+PAGE_CACHE_DIR = os.path.join(CONFIG_DIR, "cache", "ocr_pages")
+DEFAULT_MAX_MB = 512
+
+
+def file_key(path: str, settings: dict | None = None) -> str:
+    """
+    Content hash of a file plus everything that affects its extracted text
+    (extractor version, OCR settings). Renaming or moving the file keeps
+    the key; editing it or changing the settings does not.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{EXTRACTOR_VERSION}\0".encode())
+    h.update(json.dumps(settings or {}, sort_keys=True).encode())
+    h.update(b"\0")
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted text, one file per entry.
+    Used for whole files (CACHE_DIR) and for OCR'd pages (PAGE_CACHE_DIR).
+    Least recently used entries are evicted once the total size
+    exceeds `max_mb`. Use counts are kept in `hits` / `misses`.
+    Safe to share between threads.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_mb: int = DEFAULT_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Bytes on disk as far as this instance knows; measured on first put
+        self._size: int | None = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".txt")
+
+    def __contains__(self, key: str) -> bool:
+        """Whether `key` has an entry; not counted in hits / misses."""
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Touch so LRU eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+        # Only rescan the directory when the running total says we're over
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += os.path.getsize(path)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every entry."""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+
+        for name in names:
+            if not name.endswith(".txt"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Delete least recently used entries until under the size cap."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+    def clear(self) -> None:
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+        self._size = 0
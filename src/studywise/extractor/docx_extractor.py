@@ -1,40 +1,124 @@
-from docx import Document
+import zipfile
+from typing import Iterator
+from xml.etree.ElementTree import ParseError, iterparse
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+P, T, TAB, BR, CR = W + "p", W + "t", W + "tab", W + "br", W + "cr"
+TBL, TR, TC, BODY = W + "tbl", W + "tr", W + "tc", W + "body"
+
+
+def iter_docx_blocks(docx_path: str) -> Iterator[str]:
+    """
+    Stream paragraphs and table rows from word/document.xml in document order.
+
+    Paragraphs are yielded as stripped text, table rows as their non-empty
+    cells joined with " | " (paragraphs inside a cell joined with newlines,
+    nested tables flattened into their cell). Finished elements are
+    discarded as parsing goes, so memory stays flat on huge documents.
+    """
+    with zipfile.ZipFile(docx_path) as zf, zf.open("word/document.xml") as xml:
+        body = None
+        paragraphs: list[list[str]] = []   # open <w:p>, innermost last (text boxes nest)
+        table_depth = 0
+        cells: list[str] = []              # current outer-table row
+        cell_lines: list[str] = []         # current outer-table cell
+
+        for event, elem in iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+
+            if event == "start":
+                if tag == P:
+                    paragraphs.append([])
+                elif tag == TBL:
+                    table_depth += 1
+                elif tag == TR and table_depth == 1:
+                    cells = []
+                elif tag == TC and table_depth == 1:
+                    cell_lines = []
+                elif tag == BODY:
+                    body = elem
+                continue
+
+            if tag == T and paragraphs:
+                paragraphs[-1].append(elem.text or "")
+            elif tag == TAB and paragraphs:
+                paragraphs[-1].append("\t")
+            elif tag in (BR, CR) and paragraphs:
+                paragraphs[-1].append("\n")
+            elif tag == P:
+                text = "".join(paragraphs.pop()).strip()
+                if text:
+                    if table_depth:
+                        cell_lines.append(text)
+                    elif paragraphs:
+                        # Text box inside a paragraph: keep it with its host
+                        paragraphs[-1].append(" " + text + " ")
+                    else:
+                        yield text
+            elif tag == TC and table_depth == 1:
+                cell = "\n".join(cell_lines).strip()
+                if cell:
+                    cells.append(cell)
+            elif tag == TR and table_depth == 1:
+                if cells:
+                    yield " | ".join(cells)
+            elif tag == TBL:
+                table_depth -= 1
+
+            # Drop finished top-level blocks
+            if body is not None and not table_depth and not paragraphs and tag in (P, TBL):
+                body.clear()
+
+
+def _extract_with_python_docx(docx_path: str) -> str:
+    from docx import Document  # optional fallback
+
+    doc = Document(docx_path)
+    full_text = []
+
+    for paragraph in doc.paragraphs:
+        text = paragraph.text.strip()
+        if text:
+            full_text.append(text)
+
+    # Extract text from tables if present
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = []
+            for cell in row.cells:
+                cell_text = cell.text.strip()
+                if cell_text:
+                    row_text.append(cell_text)
+            if row_text:
+                full_text.append(" | ".join(row_text))
+
+    return "\n".join(full_text).strip()
 
 
 def extract_text_from_docx(docx_path: str) -> str:
     """
     Extract text from DOCX files while preserving paragraph structure.
-    
+
+    Uses the streaming reader (iter_docx_blocks); python-docx, if installed,
+    is only tried when the streaming reader cannot parse the file.
+
     Args:
         docx_path: Path to the DOCX file
-        
+
     Returns:
         Extracted text with preserved paragraphs
-        
+
     Raises:
         Exception: If file cannot be read
     """
     try:
-        doc = Document(docx_path)
-        full_text = []
-        
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if text:
-                full_text.append(text)
-        
-        # Extract text from tables if present
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = []
-                for cell in row.cells:
-                    cell_text = cell.text.strip()
-                    if cell_text:
-                        row_text.append(cell_text)
-                if row_text:
-                    full_text.append(" | ".join(row_text))
-        
-        return "\n".join(full_text).strip()
-    
+        return "\n".join(iter_docx_blocks(docx_path)).strip()
+    except (zipfile.BadZipFile, KeyError, ParseError) as stream_error:
+        try:
+            return _extract_with_python_docx(docx_path)
+        except ImportError:
+            raise RuntimeError(f"Failed to extract from DOCX: {str(stream_error)}")
+        except Exception as e:
+            raise RuntimeError(f"Failed to extract from DOCX: {str(e)}")
     except Exception as e:
         raise RuntimeError(f"Failed to extract from DOCX: {str(e)}")
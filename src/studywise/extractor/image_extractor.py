@@ -1,7 +1,30 @@
-from PIL import Image
-import pytesseract
+from studywise.extractor.image_preprocess import preprocess_for_ocr
+from studywise.extractor.ocr_engine import get_engine
 
-def extract_text_from_image(image_path: str) -> str:
-    image = Image.open(image_path)
-    text = pytesseract.image_to_string(image)
-    return text.strip()
+# Images OCR'd per engine call. One tesseract process reads the whole
+# batch; the preprocessed images are held in memory until it is done.
+IMAGE_BATCH_SIZE = 8
+
+
+def extract_text_from_images(image_paths: list[str], preprocess: dict | None = None) -> list[str]:
+    """
+    OCR several image files, IMAGE_BATCH_SIZE per engine call, and
+    return their texts in the same order. `preprocess` holds
+    preprocess_for_ocr settings; None uses the defaults.
+    """
+    from PIL import Image
+
+    engine = get_engine()
+    texts = []
+    for start in range(0, len(image_paths), IMAGE_BATCH_SIZE):
+        prepared = []
+        for path in image_paths[start:start + IMAGE_BATCH_SIZE]:
+            with Image.open(path) as image:
+                prepared.append(preprocess_for_ocr(image, **(preprocess or {})))
+        texts.extend(engine.ocr_batch(prepared))
+    return texts
+
+
+def extract_text_from_image(image_path: str, preprocess: dict | None = None) -> str:
+    """OCR one image file; see extract_text_from_images."""
+    return extract_text_from_images([image_path], preprocess)[0]
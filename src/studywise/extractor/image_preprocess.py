@@ -0,0 +1,129 @@
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Defaults for preprocess_for_ocr; config.py exposes the same knobs
+DEFAULT_PREPROCESS = {
+    "max_megapixels": 8.0,   # ~A4 at 300 dpi; tesseract gains nothing above
+    "target_dpi": 300,       # only used when the file records its DPI
+    "grayscale": True,
+    "binarize": False,
+    "crop_margins": True,
+}
+
+
+def _otsu_threshold(image: "Image.Image") -> int:
+    """Otsu's threshold from an 8-bit grayscale histogram."""
+    hist = image.histogram()[:256]
+    total = sum(hist)
+    if not total:
+        return 128
+
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = 0
+    weight_bg = 0
+    best, best_t = -1.0, 128
+
+    for t, h in enumerate(hist):
+        weight_bg += h
+        if not weight_bg:
+            continue
+        weight_fg = total - weight_bg
+        if not weight_fg:
+            break
+        sum_bg += t * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, best_t = between, t
+
+    return best_t
+
+
+def _scale_factor(image: "Image.Image", dpi, max_megapixels: float, target_dpi: int) -> float:
+    scale = 1.0
+
+    if dpi and target_dpi:
+        source_dpi = max(float(dpi[0]), float(dpi[1]))
+        if source_dpi > target_dpi:
+            scale = target_dpi / source_dpi
+
+    if max_megapixels:
+        pixels = image.width * image.height * scale * scale
+        budget = max_megapixels * 1_000_000
+        if pixels > budget:
+            scale *= math.sqrt(budget / pixels)
+
+    return scale
+
+
+def _crop_uniform_margins(image: "Image.Image", tolerance: int = 24, pad: int = 8) -> "Image.Image":
+    """Trim borders that match the top-left pixel's colour."""
+    from PIL import Image, ImageChops
+    gray = image if image.mode == "L" else image.convert("L")
+    background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+    diff = ImageChops.difference(gray, background).point(lambda p: 255 if p > tolerance else 0)
+    bbox = diff.getbbox()
+    if not bbox:
+        return image
+
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - pad),
+        max(0, top - pad),
+        min(image.width, right + pad),
+        min(image.height, bottom + pad),
+    ))
+
+
+def preprocess_for_ocr(image: "Image.Image", **settings) -> "Image.Image":
+    """
+    Shrink and simplify an image before OCR.
+
+    Keyword settings default to DEFAULT_PREPROCESS:
+        max_megapixels: downsample until the image fits this pixel budget
+        target_dpi: downsample images whose recorded DPI is higher
+        grayscale: convert to 8-bit grayscale
+        binarize: threshold to black and white (Otsu)
+        crop_margins: cut uniform borders around the content
+    """
+    from PIL import Image, ImageOps
+
+    opts = {**DEFAULT_PREPROCESS, **settings}
+    dpi = image.info.get("dpi")
+    # Phone photos are often stored sideways with an EXIF rotation flag
+    image = ImageOps.exif_transpose(image)
+
+    if opts["grayscale"] or opts["binarize"]:
+        image = image.convert("L")
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    scale = _scale_factor(image, dpi, opts["max_megapixels"], opts["target_dpi"])
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # reducing_gap lets PIL do most of the work with a cheap box reduce
+        image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+    if opts["crop_margins"]:
+        image = _crop_uniform_margins(image)
+
+    if opts["binarize"]:
+        threshold = _otsu_threshold(image)
+        image = image.point(lambda p: 255 if p > threshold else 0)
+
+    return image
+
+
+def preprocess_settings(cfg: dict) -> dict:
+    """Pick the preprocessing settings out of the app config."""
+    return {
+        "max_megapixels": cfg.get("ocr_max_megapixels", DEFAULT_PREPROCESS["max_megapixels"]),
+        "target_dpi": cfg.get("ocr_target_dpi", DEFAULT_PREPROCESS["target_dpi"]),
+        "grayscale": cfg.get("ocr_grayscale", DEFAULT_PREPROCESS["grayscale"]),
+        "binarize": cfg.get("ocr_binarize", DEFAULT_PREPROCESS["binarize"]),
+        "crop_margins": cfg.get("ocr_crop_margins", DEFAULT_PREPROCESS["crop_margins"]),
+    }
@@ -1,31 +1,396 @@
 import os
-from studywise.extractor.pdf_extractor import extract_text_from_pdf
-from studywise.extractor.image_extractor import extract_text_from_image
+import tempfile
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from typing import Callable, Iterator, NamedTuple
+
+from studywise.extractor.cache import ExtractionCache, file_key
+from studywise.extractor.pdf_extractor import (
+    OcrSettings, PageStats, iter_pdf_pages, release_page_cache, resolve_ocr_workers
+)
+from studywise.extractor.image_extractor import IMAGE_BATCH_SIZE, extract_text_from_images
 from studywise.extractor.docx_extractor import extract_text_from_docx
+from studywise.text_markers import PAGE_BREAK
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Don't start another file while this much input is already being read
+DEFAULT_MEMORY_MB = 256
+
+
+class FileResult(NamedTuple):
+    path: str
+    text: str
+    error: str | None = None
+
+
+def extraction_settings(
+    preprocess: dict | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> dict:
+    """Settings that change extracted text; part of the cache key."""
+    return {
+        "ocr": (ocr_settings or OcrSettings())._asdict(),
+        "preprocess": preprocess or {},
+    }
+
 
+def _iter_file_text(
+    path: str,
+    ocr_workers: int | None = None,
+    preprocess: dict | None = None,
+    page_cache_dir: str | None = None,
+    page_stats: PageStats | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> Iterator[str]:
+    ext = path.lower()
+    if ext.endswith(".pdf"):
+        pages = iter_pdf_pages(path, ocr_workers, page_cache_dir, ocr_settings=ocr_settings)
+        for page in pages:
+            if page_stats is not None:
+                page_stats.add(page)
+            if page.text:
+                yield page.text + PAGE_BREAK
+    elif ext.endswith(IMAGE_EXTENSIONS):
+        yield extract_text_from_images([path], preprocess)[0]
+    elif ext.endswith(".docx"):
+        yield extract_text_from_docx(path)
+    else:
+        yield ""
 
-def extract_and_merge(files: list[str]) -> str:
+
+def _ocr_images(paths: list[str], preprocess: dict | None) -> list[tuple[str, str | None]]:
     """
-    Extracts text from multiple files and merges them with clear separators.
-    Supports: PDF, PNG, JPG, JPEG, DOCX
+    (text, error) per image, OCR'd as one batch. If the batch fails,
+    the images are retried one by one so a bad file only fails itself.
     """
-    combined = []
+    try:
+        return [(text, None) for text in extract_text_from_images(paths, preprocess)]
+    except Exception:
+        pass
+
+    results = []
+    for path in paths:
+        try:
+            results.append((extract_text_from_images([path], preprocess)[0], None))
+        except Exception as e:
+            results.append(("", str(e) or type(e).__name__))
+    return results
+
+
+def _image_run(files: list[str], start: int, cached) -> list[int]:
+    """Indices of the images from `start` on, up to the next other file, that are not `cached`."""
+    run = []
+    index = start
+    while (
+        index < len(files) and len(run) < IMAGE_BATCH_SIZE
+        and files[index].lower().endswith(IMAGE_EXTENSIONS)
+    ):
+        if not cached(index):
+            run.append(index)
+        index += 1
+    return run
+
 
-    for path in files:
+def iter_extracted_text(
+    files: list[str],
+    ocr_workers: int | None = None,
+    cache: ExtractionCache | None = None,
+    preprocess: dict | None = None,
+    page_cache_dir: str | None = None,
+    page_stats: PageStats | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> Iterator[str]:
+    """
+    Yields the merged text piece by piece: a separator for each file,
+    then its text (page by page for PDFs) as soon as it is extracted.
+    `ocr_workers` is passed to the PDF extractor for scanned pages and
+    `preprocess` to the image extractor.
+    With a `cache`, unchanged files are served from disk; with a
+    `page_cache_dir`, repeated scanned pages are OCR'd only once.
+    PDF pages extracted (not cached) are counted in `page_stats`, and
+    scanned pages are rendered according to `ocr_settings`.
+    Consecutive images are OCR'd together, in one engine call.
+    """
+    settings = extraction_settings(preprocess, ocr_settings)
+    keys: dict[int, str] = {}
+    # Texts of images OCR'd ahead, in the batch of an earlier image
+    ocr_done: dict[int, str] = {}
+
+    def key_of(index: int) -> str:
+        if index not in keys:
+            keys[index] = file_key(files[index], settings)
+        return keys[index]
+
+    def is_cached(index: int) -> bool:
+        return cache is not None and key_of(index) in cache
+
+    for index, path in enumerate(files):
         name = os.path.basename(path)
-        combined.append(f"\n\n===== FILE: {name} =====\n\n")
+        yield f"\n\n===== FILE: {name} =====\n\n"
+
+        if index not in ocr_done and cache is not None:
+            cached = cache.get(key_of(index))
+            if cached is not None:
+                yield cached
+                continue
+
+        if index not in ocr_done and path.lower().endswith(IMAGE_EXTENSIONS):
+            # OCR it together with the uncached images right after it
+            run = [index] + _image_run(files, index + 1, is_cached)
+            texts = extract_text_from_images([files[i] for i in run], preprocess)
+            ocr_done.update(zip(run, texts))
+
+        if index in ocr_done:
+            text = ocr_done.pop(index)
+            if cache is not None:
+                cache.put(key_of(index), text)
+            yield text
+            continue
+
+        if cache is None:
+            yield from _iter_file_text(
+                path, ocr_workers, preprocess, page_cache_dir, page_stats, ocr_settings
+            )
+            continue
+
+        key = key_of(index)
+
+        pieces = []
+        for piece in _iter_file_text(
+            path, ocr_workers, preprocess, page_cache_dir, page_stats, ocr_settings
+        ):
+            pieces.append(piece)
+            yield piece
+        cache.put(key, "\n".join(pieces))
+
+
+def _extract_file(
+    path: str,
+    ocr_workers: int | None,
+    cache: ExtractionCache | None,
+    preprocess: dict | None = None,
+    page_cache_dir: str | None = None,
+    page_stats: PageStats | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> str:
+    """Extract one whole file. Runs in a thread of extract_files."""
+    key = None
+    if cache is not None:
+        key = file_key(path, extraction_settings(preprocess, ocr_settings))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    pieces = _iter_file_text(
+        path, ocr_workers, preprocess, page_cache_dir, page_stats, ocr_settings
+    )
+    text = "\n".join(pieces)
 
-        ext = path.lower()
-        if ext.endswith(".pdf"):
-            text = extract_text_from_pdf(path)
-        elif ext.endswith((".png", ".jpg", ".jpeg")):
-            text = extract_text_from_image(path)
-        elif ext.endswith(".docx"):
-            text = extract_text_from_docx(path)
+    if cache is not None:
+        cache.put(key, text)
+    return text
+
+
+def _extract_images(
+    paths: list[str],
+    cache: ExtractionCache | None,
+    image_pool: ProcessPoolExecutor | None,
+    preprocess: dict | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> list[tuple[str, str | None]]:
+    """
+    OCR a batch of uncached images in one engine call; (text, error) per
+    image. Runs in a thread of extract_files.
+    """
+    if image_pool is not None:
+        # OCR is CPU-bound: run it in a process, this thread just waits
+        results = image_pool.submit(_ocr_images, paths, preprocess).result()
+    else:
+        results = _ocr_images(paths, preprocess)
+
+    if cache is not None:
+        settings = extraction_settings(preprocess, ocr_settings)
+        for path, (text, error) in zip(paths, results):
+            if not error:
+                cache.put(file_key(path, settings), text)
+    return results
+
+
+def extract_files(
+    files: list[str],
+    ocr_workers: int | None = None,
+    cache: ExtractionCache | None = None,
+    max_workers: int = 4,
+    memory_mb: int = DEFAULT_MEMORY_MB,
+    on_progress: Callable[[int, int, FileResult], None] | None = None,
+    preprocess: dict | None = None,
+    page_cache_dir: str | None = None,
+    page_stats: PageStats | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> list[FileResult]:
+    """
+    Extracts several files at once and returns one FileResult per file,
+    in input order.
+
+    Files are read in up to `max_workers` threads. Runs of consecutive
+    uncached images are OCR'd in batches, one engine call each, in a
+    process pool; a batch is started like a single file. New files are
+    not started while the ones in flight add up to more than `memory_mb`
+    on disk. A failing file is recorded in its FileResult and does not
+    stop the others.
+    `on_progress(done, total, result)` is called in the calling thread
+    as each file finishes.
+    """
+    total = len(files)
+    results: list[FileResult | None] = [None] * total
+    cpu_budget = resolve_ocr_workers(ocr_workers)
+    # PDFs in flight share the OCR processes instead of each taking all cores
+    pdf_ocr_workers = max(1, cpu_budget // max(1, max_workers))
+    budget = memory_mb * 1024 * 1024
+    settings = extraction_settings(preprocess, ocr_settings)
+
+    # Images not in the cache are OCR'd in batches, enough of them to
+    # keep every OCR process busy
+    uncached_images = {
+        i for i, p in enumerate(files)
+        if p.lower().endswith(IMAGE_EXTENSIONS)
+        and not (cache is not None and file_key(p, settings) in cache)
+    }
+    batch_size = min(IMAGE_BATCH_SIZE, -(-len(uncached_images) // cpu_budget)) or 1
+
+    # What is started at once: one file, or a batch of images in a row
+    jobs: list[list[int]] = []
+    for index in range(total):
+        previous = jobs[-1] if jobs else []
+        if (
+            index in uncached_images and previous and previous[0] in uncached_images
+            and previous[-1] == index - 1 and len(previous) < batch_size
+        ):
+            previous.append(index)
         else:
-            text = ""
+            jobs.append([index])
 
-        combined.append(text)
+    image_pool = None
+    if uncached_images and cpu_budget > 1:
+        # OCR is CPU-bound: run it in processes, the file threads just wait
+        image_pool = ProcessPoolExecutor(max_workers=cpu_budget)
 
-    return "\n".join(combined).strip()
+    def size_of(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as threads:
+            inflight = {}
+            inflight_bytes = 0
+            next_job = 0
+            done_count = 0
+
+            while next_job < len(jobs) or inflight:
+                while next_job < len(jobs) and len(inflight) < max(1, max_workers):
+                    job = jobs[next_job]
+                    size = sum(size_of(files[i]) for i in job)
+                    if inflight and inflight_bytes + size > budget:
+                        break
+                    if job[0] in uncached_images:
+                        future = threads.submit(
+                            _extract_images,
+                            [files[i] for i in job], cache, image_pool, preprocess, ocr_settings
+                        )
+                    else:
+                        future = threads.submit(
+                            _extract_file,
+                            files[job[0]], pdf_ocr_workers, cache,
+                            preprocess, page_cache_dir, page_stats, ocr_settings
+                        )
+                    inflight[future] = (job, size)
+                    inflight_bytes += size
+                    next_job += 1
+
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, size = inflight.pop(future)
+                    inflight_bytes -= size
+                    try:
+                        outcome = future.result()
+                        if job[0] not in uncached_images:
+                            outcome = [(outcome, None)]
+                    except Exception as e:
+                        outcome = [("", str(e) or type(e).__name__)] * len(job)
+                    for index, (text, error) in zip(job, outcome):
+                        result = FileResult(files[index], text, error)
+                        results[index] = result
+                        done_count += 1
+                        if on_progress:
+                            on_progress(done_count, total, result)
+    finally:
+        if image_pool is not None:
+            image_pool.shutdown(cancel_futures=True)
 
+    return results
+
+
+def extract_and_merge(
+    files: list[str],
+    ocr_workers: int | None = None,
+    cache: ExtractionCache | None = None,
+    max_workers: int = 1,
+    memory_mb: int = DEFAULT_MEMORY_MB,
+    on_progress: Callable[[int, int, FileResult], None] | None = None,
+    preprocess: dict | None = None,
+    page_cache_dir: str | None = None,
+    page_stats: PageStats | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> str:
+    """
+    Extracts text from multiple files and merges them with clear separators.
+    Supports: PDF, PNG, JPG, JPEG, DOCX
+
+    With `max_workers` > 1 files are extracted concurrently (see
+    extract_files); failed files are left empty and reported through
+    `on_progress`, and an error is raised only if every file failed.
+
+    Scanned pages are OCR'd once per distinct image across all files:
+    OCR results are kept in `page_cache_dir`, or in a temporary
+    directory for this call when it is None.
+    """
+    if page_cache_dir is None:
+        with tempfile.TemporaryDirectory(prefix="studywise_pages_") as run_dir:
+            try:
+                return extract_and_merge(
+                    files, ocr_workers, cache, max_workers, memory_mb,
+                    on_progress, preprocess, run_dir, page_stats, ocr_settings
+                )
+            finally:
+                release_page_cache(run_dir)
+
+    if max_workers <= 1:
+        pieces = iter_extracted_text(
+            files, ocr_workers, cache, preprocess, page_cache_dir, page_stats, ocr_settings
+        )
+        return "\n".join(pieces).strip()
+
+    results = extract_files(
+        files, ocr_workers, cache,
+        max_workers=max_workers,
+        memory_mb=memory_mb,
+        on_progress=on_progress,
+        preprocess=preprocess,
+        page_cache_dir=page_cache_dir,
+        page_stats=page_stats,
+        ocr_settings=ocr_settings
+    )
+    if results and all(r.error for r in results):
+        raise RuntimeError(f"Failed to extract any file: {results[0].error}")
+
+    combined = []
+    for result in results:
+        name = os.path.basename(result.path)
+        combined.append(f"\n\n===== FILE: {name} =====\n\n")
+        combined.append(result.text)
+
+    return "\n".join(combined).strip()
@@ -0,0 +1,210 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class OcrResult(NamedTuple):
+    text: str
+    # Mean word confidence, 0-100; -1 when no words were found
+    confidence: float
+
+
+def parse_tsv(tsv: str, pages: int) -> list[OcrResult]:
+    """
+    Rebuild text and mean word confidence per page from tesseract TSV
+    output (image_to_data, or the CLI's `tsv` config over a list file).
+    Words on one line are joined by spaces, lines by newlines, and
+    paragraphs are separated by a blank line.
+    """
+    lines: list[list[tuple[tuple[str, str, str], list[str]]]] = [[] for _ in range(pages)]
+    confs: list[list[float]] = [[] for _ in range(pages)]
+
+    for row in tsv.splitlines()[1:]:
+        cols = row.split("\t")
+        # Level 5 rows are words
+        if len(cols) < 12 or cols[0] != "5":
+            continue
+        word = cols[11].strip()
+        try:
+            conf = float(cols[10])
+            page = int(cols[1]) - 1
+        except ValueError:
+            continue
+        if not word or conf < 0 or not 0 <= page < pages:
+            continue
+
+        key = (cols[2], cols[3], cols[4])  # block, paragraph, line
+        page_lines = lines[page]
+        if page_lines and page_lines[-1][0] == key:
+            page_lines[-1][1].append(word)
+        else:
+            page_lines.append((key, [word]))
+        confs[page].append(conf)
+
+    results = []
+    for page_lines, page_confs in zip(lines, confs):
+        out = []
+        prev = None
+        for key, words in page_lines:
+            if prev is not None and key[:2] != prev[:2]:
+                out.append("")
+            out.append(" ".join(words))
+            prev = key
+        confidence = sum(page_confs) / len(page_confs) if page_confs else -1.0
+        results.append(OcrResult("\n".join(out), confidence))
+    return results
+
+
+class OcrEngine(ABC):
+    """Turns a batch of PIL images into texts, in the same order."""
+
+    name = "base"
+
+    @abstractmethod
+    def ocr_batch(self, images: list["Image.Image"]) -> list[str]:
+        ...
+
+    @abstractmethod
+    def ocr_data_batch(self, images: list["Image.Image"]) -> list[OcrResult]:
+        """Like ocr_batch, with each text's mean word confidence."""
+
+    def ocr(self, image: "Image.Image") -> str:
+        return self.ocr_batch([image])[0]
+
+
+class PytesseractEngine(OcrEngine):
+    """One tesseract process per image. Always available."""
+
+    name = "pytesseract"
+
+    def ocr_batch(self, images: list["Image.Image"]) -> list[str]:
+        import pytesseract
+        return [pytesseract.image_to_string(image).strip() for image in images]
+
+    def ocr_data_batch(self, images: list["Image.Image"]) -> list[OcrResult]:
+        import pytesseract
+        return [parse_tsv(pytesseract.image_to_data(image), 1)[0] for image in images]
+
+
+class TesseractBatchEngine(OcrEngine):
+    """
+    Runs the tesseract CLI once per batch using its list-file mode,
+    so process startup and model loading are paid once per batch
+    instead of once per image.
+    """
+
+    name = "tesseract-batch"
+
+    def __init__(self, cmd: str):
+        self.cmd = cmd
+
+    def ocr_batch(self, images: list["Image.Image"]) -> list[str]:
+        # Tesseract ends every page with a form feed
+        texts = [t.strip() for t in self._run(images).split("\f")]
+        if len(texts) < len(images):
+            raise RuntimeError("Tesseract returned fewer pages than it was given")
+        return texts[:len(images)]
+
+    def ocr_data_batch(self, images: list["Image.Image"]) -> list[OcrResult]:
+        return parse_tsv(self._run(images, "tsv"), len(images))
+
+    def _run(self, images: list["Image.Image"], *configs: str) -> str:
+        """Run tesseract over all images in one process; return its stdout."""
+        with tempfile.TemporaryDirectory(prefix="studywise_ocr_") as tmp:
+            paths = []
+            for i, image in enumerate(images):
+                # PNM is a raw dump, no compression work on either side
+                path = os.path.join(tmp, f"{i:05d}.pnm")
+                image.save(path, format="PPM")
+                paths.append(path)
+
+            list_file = os.path.join(tmp, "pages.txt")
+            with open(list_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(paths) + "\n")
+
+            result = subprocess.run(
+                [self.cmd, list_file, "stdout", *configs],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "Tesseract failed")
+        return result.stdout
+
+
+class TesserocrEngine(OcrEngine):
+    """
+    In-process tesseract through tesserocr. The API object, and the
+    language model it loads, live as long as the engine.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        from tesserocr import PyTessBaseAPI  # type: ignore
+        self._api = PyTessBaseAPI()
+        self._lock = threading.Lock()
+
+    def ocr_batch(self, images: list["Image.Image"]) -> list[str]:
+        texts = []
+        with self._lock:
+            for image in images:
+                self._api.SetImage(image)
+                texts.append(self._api.GetUTF8Text().strip())
+        return texts
+
+    def ocr_data_batch(self, images: list["Image.Image"]) -> list[OcrResult]:
+        results = []
+        with self._lock:
+            for image in images:
+                self._api.SetImage(image)
+                text = self._api.GetUTF8Text().strip()
+                confidence = float(self._api.MeanTextConf()) if text else -1.0
+                results.append(OcrResult(text, confidence))
+        return results
+
+
+_engine: OcrEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def _create_engine(name: str) -> OcrEngine:
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine()
+        except Exception:
+            if name == "tesserocr":
+                raise
+
+    if name in ("auto", "tesseract-batch"):
+        import pytesseract
+        cmd = shutil.which(pytesseract.pytesseract.tesseract_cmd)
+        if cmd:
+            return TesseractBatchEngine(cmd)
+        if name == "tesseract-batch":
+            raise RuntimeError("Tesseract executable not found")
+
+    return PytesseractEngine()
+
+
+def get_engine(name: str = "auto") -> OcrEngine:
+    """
+    Shared OCR engine for this process, created on first use.
+    "auto" prefers tesserocr, then tesseract batch mode, then pytesseract.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None or (name != "auto" and _engine.name != name):
+            _engine = _create_engine(name)
+        return _engine
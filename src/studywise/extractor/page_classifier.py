@@ -0,0 +1,52 @@
+PAGE_BLANK = "blank"
+PAGE_PICTURE = "picture"
+PAGE_TEXT = "text"
+
+# Thumbnail resolution; enough to see text lines, a few ms to render
+THUMBNAIL_DPI = 36
+# Below this share of ink pixels a page is blank (scanner specks, faint
+# bleed-through, grey or coloured paper). One short line of text is
+# several times more.
+BLANK_MAX_INK = 0.0003
+# Above this share of mid-tone pixels a page is a photo or diagram
+PICTURE_MIN_MIDTONES = 0.35
+
+
+def classify_pixels(samples, width: int, height: int, stride: int) -> str:
+    """Classify an 8-bit grayscale image from its raw samples."""
+    import numpy as np
+
+    pixels = np.frombuffer(samples, dtype=np.uint8)
+    pixels = pixels.reshape(height, stride)[:, :width]
+    if not pixels.size:
+        return PAGE_BLANK
+
+    # Measure against the page's own background, not pure white
+    background = float(np.percentile(pixels, 90))
+    ink = float(np.count_nonzero(pixels < background - 64)) / pixels.size
+    # Not the spread of gray levels: on a page with a single line of
+    # text it is as low as on an empty one
+    if ink < BLANK_MAX_INK:
+        return PAGE_BLANK
+
+    midtones = float(np.count_nonzero((pixels > 48) & (pixels < background - 48))) / pixels.size
+    if midtones > PICTURE_MIN_MIDTONES:
+        return PAGE_PICTURE
+    return PAGE_TEXT
+
+
+def classify_page(page) -> str:
+    """
+    Look at a low-DPI thumbnail of a PDF page and call it blank,
+    picture-only or text-bearing, before paying for a full render.
+    Pages are treated as text-bearing when NumPy is not installed.
+    """
+    import fitz  # PyMuPDF
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return PAGE_TEXT
+
+    pix = page.get_pixmap(dpi=THUMBNAIL_DPI, colorspace=fitz.csGRAY, alpha=False)
+    return classify_pixels(pix.samples_mv, pix.width, pix.height, pix.stride)
@@ -1,24 +1,399 @@
-import fitz  # PyMuPDF
-from PIL import Image
-import pytesseract
-import io
+import hashlib
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterator, NamedTuple
+
+from studywise.extractor.cache import ExtractionCache
+from studywise.extractor.ocr_engine import get_engine
+from studywise.extractor.page_classifier import PAGE_BLANK, PAGE_PICTURE, classify_page
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# PyMuPDF and Pillow are imported where they are used, so importing
+# this module stays cheap
+
+OCR_DPI = 300
+# Scanned pages handed to the OCR engine per call
+OCR_BATCH_SIZE = 4
+
+# A page whose only image covers this much of it is OCR'd from that image
+NATIVE_MIN_COVERAGE = 0.85
+# ...as long as the image's own resolution is in this range (dpi)
+NATIVE_MIN_DPI = 150
+NATIVE_MAX_DPI = 600
+# Size cap of a page OCR cache directory
+PAGE_CACHE_MAX_MB = 128
+
+# Each pool worker keeps its own handle to the PDF it is OCR'ing
+_worker_doc = None
+_worker_path = None
+
+# Page OCR caches by directory, reused until release_page_cache
+_page_caches: dict[str, ExtractionCache] = {}
+
+
+# PdfPage.kind values
+KIND_TEXT = "text"        # has a text layer
+KIND_SCAN = "scan"        # scanned text, OCR'd
+KIND_PICTURE = "picture"  # mostly picture, OCR'd for captions
+KIND_BLANK = "blank"      # blank scan, skipped
+
+
+class PdfPage(NamedTuple):
+    """One extracted page. `page_number` is 1-based."""
+    page_number: int
+    text: str
+    ocr: bool
+    kind: str = KIND_TEXT
+
+
+class OcrSettings(NamedTuple):
+    """How scanned pages are rendered for OCR."""
+    dpi: int = OCR_DPI
+    # Try draft_dpi first; re-render at dpi only below min_confidence
+    adaptive: bool = True
+    draft_dpi: int = 200
+    min_confidence: float = 75.0
+
+
+class PageStats:
+    """Page counts by kind over one extraction run. Safe to share between threads."""
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, page: PdfPage) -> None:
+        with self._lock:
+            self.counts[page.kind] = self.counts.get(page.kind, 0) + 1
+
+    def get(self, kind: str) -> int:
+        return self.counts.get(kind, 0)
+
+
+def resolve_ocr_workers(ocr_workers: int | None = None) -> int:
+    """
+    Number of OCR processes to use.
+    0 or None means one per CPU core; never more than the machine has.
+    """
+    cpus = os.cpu_count() or 1
+    if not ocr_workers or ocr_workers < 1:
+        return cpus
+    return min(ocr_workers, cpus)
+
+
+def render_page(page, dpi: int = OCR_DPI):
+    """Render a page straight to 8-bit grayscale, which is what OCR wants."""
+    import fitz  # PyMuPDF
+    return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+
+
+def pixmap_to_image(pix) -> "Image.Image":
+    """
+    Wrap a grayscale pixmap's sample buffer as a PIL image without
+    encoding it to PNG and decoding it again. The image shares memory
+    with `pix`, so keep the pixmap alive while the image is in use.
+    """
+    from PIL import Image
+    return Image.frombuffer(
+        "L", (pix.width, pix.height), pix.samples_mv, "raw", "L", pix.stride, 1
+    )
+
+
+def embedded_page_image(doc, page):
+    """
+    If the page is a single scanned image, return that image as a grayscale
+    pixmap at its native resolution; otherwise None.
+
+    Only upright images covering most of the page qualify, and only when
+    their native resolution is usable for OCR. Everything else (composite
+    pages, rotated placements, thumbnails) is left to render_page.
+    """
+    import fitz  # PyMuPDF
+
+    images = page.get_images(full=True)
+    if len(images) != 1 or page.rotation:
+        return None
+
+    xref = images[0][0]
+    placements = page.get_image_rects(xref, transform=True)
+    if len(placements) != 1:
+        return None
+
+    rect, matrix = placements[0]
+    if abs(matrix.b) > 1e-3 or abs(matrix.c) > 1e-3:
+        return None
+    if rect.is_empty or rect.get_area() < NATIVE_MIN_COVERAGE * page.rect.get_area():
+        return None
+
+    try:
+        pix = fitz.Pixmap(doc, xref)
+    except Exception:
+        return None
+
+    dpi = pix.width / (rect.width / 72)
+    if not NATIVE_MIN_DPI <= dpi <= NATIVE_MAX_DPI:
+        return None
+
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    return pix
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    doc = fitz.open(pdf_path)
-    full_text = ""
 
-    for page in doc:
-        text = page.get_text().strip()
+def page_image_key(pix) -> str:
+    """Byte hash of a page image; repeated slides render to identical pixels."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{pix.width}x{pix.height}x{pix.n}:".encode())
+    h.update(pix.samples_mv)
+    return h.hexdigest()
 
-        # If selectable text exists, use it
-        if text:
-            full_text += text + "\n"
+
+def _page_cache(cache_dir: str | None) -> ExtractionCache | None:
+    if not cache_dir:
+        return None
+    if cache_dir not in _page_caches:
+        _page_caches[cache_dir] = ExtractionCache(cache_dir, max_mb=PAGE_CACHE_MAX_MB)
+    return _page_caches[cache_dir]
+
+
+def release_page_cache(cache_dir: str) -> None:
+    """Forget the page cache of `cache_dir`, e.g. before deleting it."""
+    _page_caches.pop(cache_dir, None)
+
+
+def _ocr_adaptive(
+    doc,
+    page_indexes: list[int],
+    pixmaps: list,
+    native: list[bool],
+    settings: OcrSettings,
+    picture: list[bool] | None = None
+) -> list[str]:
+    """
+    OCR draft renders, then re-render and OCR again at settings.dpi only
+    the pages whose mean word confidence is below settings.min_confidence.
+    That includes pages where the draft found no words at all (small
+    print), except `picture` pages, which may well have none.
+    Embedded scans were not rendered at the draft DPI and are not retried.
+    """
+    engine = get_engine()
+    images = [pixmap_to_image(pix) for pix in pixmaps]
+    results = engine.ocr_data_batch(images)
+    picture = picture or [False] * len(results)
+
+    retry = [
+        pos for pos, result in enumerate(results)
+        if not native[pos] and result.confidence < settings.min_confidence
+        and (result.confidence >= 0 or not picture[pos])
+    ]
+    if retry:
+        sharp = [render_page(doc[page_indexes[pos]], settings.dpi) for pos in retry]
+        second = engine.ocr_data_batch([pixmap_to_image(pix) for pix in sharp])
+        for pos, result in zip(retry, second):
+            if result.confidence >= results[pos].confidence:
+                results[pos] = result
+
+    return [result.text.strip() for result in results]
+
+
+def _ocr_pages(
+    doc,
+    page_indexes: list[int],
+    page_cache_dir: str | None = None,
+    settings: OcrSettings | None = None,
+    pictures: frozenset[int] = frozenset()
+) -> list[str]:
+    """
+    Render and OCR several pages in one engine call.
+    With a `page_cache_dir`, pages whose pixels were already OCR'd (in this
+    batch, this file, or any file sharing the directory) are not OCR'd again.
+    With settings.adaptive, pages are first rendered at settings.draft_dpi
+    (see _ocr_adaptive); `pictures` are the indexes of pages classified
+    as mostly picture.
+    """
+    settings = settings or OcrSettings()
+    cache = _page_cache(page_cache_dir)
+    dpi = settings.draft_dpi if settings.adaptive else settings.dpi
+    embedded = [embedded_page_image(doc, doc[i]) for i in page_indexes]
+    # Keep the pixmaps referenced: the images share their buffers
+    pixmaps = [
+        pix if pix is not None else render_page(doc[i], dpi)
+        for i, pix in zip(page_indexes, embedded)
+    ]
+    keys = [page_image_key(pix) if cache is not None else None for pix in pixmaps]
+    texts: list[str | None] = [None] * len(pixmaps)
+
+    # Positions still needing OCR, grouped by identical image
+    todo: dict[str | int, list[int]] = {}
+    for pos, key in enumerate(keys):
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                texts[pos] = cached
+                continue
+        todo.setdefault(key if key is not None else pos, []).append(pos)
+
+    if todo:
+        groups = list(todo.values())
+        if settings.adaptive:
+            ocr_texts = _ocr_adaptive(
+                doc,
+                [page_indexes[group[0]] for group in groups],
+                [pixmaps[group[0]] for group in groups],
+                [embedded[group[0]] is not None for group in groups],
+                settings,
+                [page_indexes[group[0]] in pictures for group in groups]
+            )
+        else:
+            images = [pixmap_to_image(pixmaps[group[0]]) for group in groups]
+            ocr_texts = get_engine().ocr_batch(images)
+
+        for group, text in zip(groups, ocr_texts):
+            for pos in group:
+                texts[pos] = text
+            if cache is not None:
+                cache.put(keys[group[0]], text)
+
+    return texts
+
+
+def _ocr_pages_worker(
+    pdf_path: str,
+    page_indexes: list[int],
+    page_cache_dir: str | None = None,
+    settings: OcrSettings | None = None,
+    pictures: frozenset[int] = frozenset()
+) -> list[str]:
+    """_ocr_pages inside a pool worker, which keeps its own document handle."""
+    import fitz  # PyMuPDF
+    global _worker_doc, _worker_path
+    if _worker_doc is None or _worker_path != pdf_path:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(pdf_path)
+        _worker_path = pdf_path
+
+    return _ocr_pages(_worker_doc, page_indexes, page_cache_dir, settings, pictures)
+
+
+def _scan_kind(page) -> str:
+    """KIND_SCAN, KIND_PICTURE or KIND_BLANK from a cheap thumbnail."""
+    kind = classify_page(page)
+    if kind == PAGE_BLANK:
+        return KIND_BLANK
+    if kind == PAGE_PICTURE:
+        return KIND_PICTURE
+    return KIND_SCAN
+
+
+def iter_pdf_pages(
+    pdf_path: str,
+    ocr_workers: int | None = None,
+    page_cache_dir: str | None = None,
+    skip_blank: bool = True,
+    ocr_settings: OcrSettings | None = None
+) -> Iterator[PdfPage]:
+    """
+    Yield PdfPage records in page order as soon as each one is ready.
+
+    Pages with a text layer are yielded immediately. Pages without one are
+    OCR'd in batches of up to OCR_BATCH_SIZE, in a process pool of
+    `ocr_workers` processes when more than one core is available (see
+    resolve_ocr_workers). A text page that follows a scanned page waits
+    for that page's OCR so order is preserved. `page_cache_dir` enables
+    the page OCR cache and `ocr_settings` picks the render resolution
+    (see _ocr_pages).
+
+    With `skip_blank`, pages without a text layer are first classified from
+    a thumbnail (see page_classifier) and blank ones are yielded empty,
+    with kind KIND_BLANK, without being rendered or OCR'd.
+    """
+    import fitz  # PyMuPDF
+
+    workers = resolve_ocr_workers(ocr_workers)
+    # Bound in-flight OCR so huge scans don't queue every page at once
+    max_pending = workers * OCR_BATCH_SIZE * 2
+    pool = None
+    # (page_number, text or (future, position in batch), kind)
+    pending: deque[tuple[int, str | tuple[Future, int], str]] = deque()
+    batch: list[int] = []
+    kinds: dict[int, str] = {}
+
+    def flush():
+        nonlocal pool
+        if not batch:
+            return
+        pictures = frozenset(i for i in batch if kinds[i] == KIND_PICTURE)
+        if workers <= 1:
+            texts = _ocr_pages(doc, batch, page_cache_dir, ocr_settings, pictures)
+            for i, text in zip(batch, texts):
+                pending.append((i + 1, text, kinds.pop(i)))
         else:
-            # OCR fallback
-            pix = page.get_pixmap(dpi=300)
-            img_bytes = pix.tobytes("png")
-            image = Image.open(io.BytesIO(img_bytes))
-            ocr_text = pytesseract.image_to_string(image)
-            full_text += ocr_text + "\n"
-
-    return full_text.strip()
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=workers)
+            future = pool.submit(
+                _ocr_pages_worker, pdf_path, list(batch), page_cache_dir, ocr_settings, pictures
+            )
+            for k, i in enumerate(batch):
+                pending.append((i + 1, (future, k), kinds.pop(i)))
+        batch.clear()
+
+    def ready():
+        while pending:
+            page_number, item, kind = pending[0]
+            if isinstance(item, tuple):
+                future, k = item
+                if not future.done() and len(pending) <= max_pending:
+                    return
+                item = future.result()[k]
+            pending.popleft()
+            yield PdfPage(page_number, item, kind in (KIND_SCAN, KIND_PICTURE), kind)
+
+    doc = fitz.open(pdf_path)
+    try:
+        for i, page in enumerate(doc):
+            text = page.get_text().strip()
+
+            # If selectable text exists, use it
+            if text:
+                flush()
+                pending.append((i + 1, text, KIND_TEXT))
+                yield from ready()
+                continue
+
+            kind = _scan_kind(page) if skip_blank else KIND_SCAN
+            if kind == KIND_BLANK:
+                flush()
+                pending.append((i + 1, "", KIND_BLANK))
+            else:
+                kinds[i] = kind
+                batch.append(i)
+                if len(batch) >= OCR_BATCH_SIZE:
+                    flush()
+
+            yield from ready()
+
+        # Drain whatever OCR is still queued or running
+        flush()
+        max_pending = 0
+        yield from ready()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        doc.close()
+
+
+def extract_text_from_pdf(
+    pdf_path: str,
+    ocr_workers: int | None = None,
+    page_cache_dir: str | None = None,
+    ocr_settings: OcrSettings | None = None
+) -> str:
+    """Extract the whole PDF as one string. See iter_pdf_pages."""
+    pages = iter_pdf_pages(pdf_path, ocr_workers, page_cache_dir, ocr_settings=ocr_settings)
+    return "\n".join(page.text for page in pages).strip()
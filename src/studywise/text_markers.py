@@ -0,0 +1,5 @@
+# Markers in extracted text that the extractors write and the cleaners
+# and the UI read; kept here so neither layer imports the other.
+
+# Ends every page in extracted PDF text, so later stages can see pages
+PAGE_BREAK = "\f"
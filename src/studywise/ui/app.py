@@ -5,6 +5,7 @@ if sys.stderr:
     sys.stderr.reconfigure(encoding="utf-8", errors="replace")
 import os
 import re
+import threading
 from datetime import datetime
 from pathlib import Path
 import time
@@ -18,11 +19,18 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QThread, Signal, QObject, QPropertyAnimation, QSize, QTimer, QEasingCurve, QSequentialAnimationGroup
 from PySide6.QtGui import QPalette, QColor, QFont, QIcon, QPixmap, QTextCursor, QTextCharFormat, QShortcut
 
-from studywise.ai.ollama_client import ollama_has_model
+from studywise.ai import gemini_client, ollama_client
 from studywise.cleaner.text_cleaner import clean_text
+from studywise.cleaner.boilerplate import strip_boilerplate
+from studywise.cleaner.dedupe import remove_near_duplicates
+from studywise.ai.llm_cache import LlmCache
 from studywise.ai.summarizer import summarize_text, generate_flashcards
 from studywise.extractor.multi_extractor import extract_and_merge
+from studywise.extractor.cache import PAGE_CACHE_DIR, ExtractionCache
+from studywise.extractor.image_preprocess import preprocess_settings
+from studywise.extractor.pdf_extractor import KIND_BLANK, OcrSettings, PageStats
 from studywise.config import load_config
+from studywise.text_markers import PAGE_BREAK
 from studywise.ui.settings_dialog import SettingsDialog
 from studywise.export.markdown_exporter import to_markdown
 from studywise.export.anki_exporter import parse_flashcards, export_anki
@@ -87,6 +95,14 @@ class ProcessingStats:
         self.cleaned_chars = 0
         self.notes_chars = 0
         self.flashcards_count = 0
+        self.cache_hits = 0
+        self.failed_files = 0
+        self.chars_skipped = 0
+        self.blank_pages = 0
+        self.boilerplate_chars = 0
+        self.boilerplate_tokens = 0
+        self.llm_cache_hits = 0
+        self.llm_cache_misses = 0
         
     def start(self, files_count: int):
         self.start_time = time.time()
@@ -105,12 +121,27 @@ class ProcessingStats:
         stats.append(f"Files: {self.files_count}")
         if self.raw_chars:
             stats.append(f"Raw: {self.raw_chars:,} chars")
+        if self.cache_hits:
+            stats.append(f"Cached: {self.cache_hits} file(s)")
+        if self.failed_files:
+            stats.append(f"Failed: {self.failed_files} file(s)")
+        if self.blank_pages:
+            stats.append(f"Blank pages skipped: {self.blank_pages}")
+        if self.boilerplate_chars:
+            stats.append(
+                f"Headers/footers removed: {self.boilerplate_chars:,} chars "
+                f"(~{self.boilerplate_tokens:,} tokens)"
+            )
+        if self.chars_skipped:
+            stats.append(f"Duplicates skipped: {self.chars_skipped:,} chars")
         if self.cleaned_chars:
             stats.append(f"Cleaned: {self.cleaned_chars:,} chars")
         if self.notes_chars:
             stats.append(f"Notes: {self.notes_chars:,} chars")
         if self.flashcards_count:
             stats.append(f"Flashcards: {self.flashcards_count} cards")
+        if self.llm_cache_hits or self.llm_cache_misses:
+            stats.append(f"AI cache: {self.llm_cache_hits} hit(s), {self.llm_cache_misses} miss(es)")
         stats.append(f"Time: {self.get_elapsed()}")
         return " | ".join(stats)
     
@@ -128,23 +159,74 @@ class ProcessingStats:
 
 
 # -------------------- WORKER --------------------
+# How often the UI picks up streamed notes (milliseconds)
+STREAM_INTERVAL_MS = 150
+
+
 class Worker(QObject):
     progress = Signal(int)
     status = Signal(str)
     finished = Signal(str, dict)
     error = Signal(str)
 
-    def __init__(self, files, llm_mode, gemini_key):
+    def __init__(self, files, llm_mode, gemini_key, cfg=None):
         super().__init__()
         self.files = files
         self.llm_mode = llm_mode
         self.gemini_key = gemini_key
+        self.cfg = cfg or {}
         self.cancelled = False
         self.stats = ProcessingStats()
+        self.llm_cache = None
+        # Streamed notes not yet shown, and how much (in UTF-16 units,
+        # as Qt counts) of what was shown must be taken back first
+        self._deltas = []
+        self._retract = 0
+        self._deltas_lock = threading.Lock()
 
     def cancel(self):
         self.cancelled = True
 
+    def on_file_extracted(self, done, total, result):
+        name = os.path.basename(result.path)
+        if result.error:
+            self.stats.failed_files += 1
+            self.status.emit(f"Failed to read {name}: {result.error[:80]}")
+        else:
+            self.status.emit(f"Extracted {done}/{total}: {name}")
+        # Extraction spans 10% -> 35% of the bar
+        self.progress.emit(10 + 25 * done // max(1, total))
+
+    def on_notes_delta(self, text):
+        # Called for every few tokens from the summarizer's threads; the
+        # UI collects them on a timer (take_notes_deltas), so it isn't
+        # flooded with signals and nothing waits for the next token
+        with self._deltas_lock:
+            self._deltas.append(text)
+
+    def on_notes_retract(self, text):
+        # A chunk is retried: take back its text, from the queue if the
+        # UI hasn't picked it up yet, else from the notes view
+        with self._deltas_lock:
+            count = len(text)
+            while count and self._deltas:
+                last = self._deltas.pop()
+                if len(last) > count:
+                    self._deltas.append(last[:-count])
+                    count = 0
+                else:
+                    count -= len(last)
+            shown = text[:count]
+            self._retract += len(shown.encode("utf-16-le")) // 2
+
+    def take_notes_deltas(self):
+        """(units to remove from the end of the preview, text to add after)"""
+        with self._deltas_lock:
+            retract, self._retract = self._retract, 0
+            text = "".join(self._deltas)
+            self._deltas.clear()
+        return retract, text
+
     def run(self):
         try:
             self.stats.start(len(self.files))
@@ -154,14 +236,50 @@ class Worker(QObject):
             if self.cancelled:
                 return
 
-            raw = extract_and_merge(self.files)
+            cache = None
+            if self.cfg.get("extract_cache", True):
+                cache = ExtractionCache(max_mb=self.cfg.get("extract_cache_mb", 512))
+
+            page_stats = PageStats()
+            raw = extract_and_merge(
+                self.files,
+                ocr_workers=self.cfg.get("ocr_workers", 0),
+                cache=cache,
+                max_workers=self.cfg.get("extract_workers", 4),
+                memory_mb=self.cfg.get("extract_memory_mb", 256),
+                on_progress=self.on_file_extracted,
+                preprocess=preprocess_settings(self.cfg),
+                page_cache_dir=PAGE_CACHE_DIR if self.cfg.get("ocr_page_cache_persist") else None,
+                page_stats=page_stats,
+                ocr_settings=OcrSettings(
+                    dpi=self.cfg.get("ocr_dpi", 300),
+                    adaptive=self.cfg.get("ocr_adaptive", True),
+                    draft_dpi=self.cfg.get("ocr_draft_dpi", 200),
+                    min_confidence=self.cfg.get("ocr_min_confidence", 75.0)
+                )
+            )
+            self.stats.blank_pages = page_stats.get(KIND_BLANK)
+            if cache is not None:
+                self.stats.cache_hits = cache.hits
             if not raw.strip():
                 raise RuntimeError("No text extracted")
 
             self.stats.raw_chars = len(raw)
             self.status.emit("Cleaning content…")
             self.progress.emit(35)
-            cleaned = clean_text(raw)
+            text = raw
+            if self.cfg.get("strip_boilerplate", True):
+                # Course name, page numbers, copyright line on every page
+                stripped = strip_boilerplate(text)
+                self.stats.boilerplate_chars = stripped.chars_removed
+                self.stats.boilerplate_tokens = stripped.tokens_saved
+                text = stripped.text
+            if self.cfg.get("dedupe", True):
+                # Same lecture queued twice (PDF + DOCX, revisions): summarize it once
+                deduped = remove_near_duplicates(text)
+                self.stats.chars_skipped = deduped.chars_skipped
+                text = deduped.text
+            cleaned = clean_text(text)
 
             if self.cancelled:
                 return
@@ -169,15 +287,34 @@ class Worker(QObject):
             self.stats.cleaned_chars = len(cleaned)
             self.status.emit("Generating study notes…")
             self.progress.emit(65)
-            notes = summarize_text(cleaned, self.llm_mode, self.gemini_key)
+            if self.cfg.get("llm_cache", True):
+                self.llm_cache = LlmCache(max_mb=self.cfg.get("llm_cache_mb", 64))
+            notes = summarize_text(
+                cleaned, self.llm_mode, self.gemini_key,
+                max_tokens=self.cfg.get("chunk_tokens") or None,
+                overlap_tokens=self.cfg.get("chunk_overlap_tokens", 0),
+                max_workers=self.cfg.get("llm_concurrency") or None,
+                merge=self.cfg.get("summary_merge", True),
+                cache=self.llm_cache,
+                on_delta=self.on_notes_delta if self.cfg.get("stream_notes", True) else None,
+                on_retract=self.on_notes_retract
+            )
 
             if self.cancelled:
                 return
 
             self.stats.notes_chars = len(notes)
             self.status.emit("Generating flashcards…")
-            cards = generate_flashcards(notes, self.llm_mode, self.gemini_key)
+            cards = generate_flashcards(
+                notes, self.llm_mode, self.gemini_key,
+                max_tokens=self.cfg.get("chunk_tokens") or None,
+                max_workers=self.cfg.get("llm_concurrency") or None,
+                cache=self.llm_cache
+            )
             self.stats.flashcards_count = len(cards)
+            if self.llm_cache is not None:
+                self.stats.llm_cache_hits = self.llm_cache.hits
+                self.stats.llm_cache_misses = self.llm_cache.misses
 
             self.progress.emit(100)
             self.finished.emit(notes, {
@@ -189,6 +326,9 @@ class Worker(QObject):
 
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            if self.llm_cache is not None:
+                self.llm_cache.close()
 
 
 # -------------------- UI --------------------
@@ -229,6 +369,10 @@ class StudyWiseApp(QWidget):
         self.idle_timer.timeout.connect(self.update_idle_state)
         self.idle_timer.start(500)
 
+        # Picks up streamed notes while a worker runs
+        self.notes_timer = QTimer()
+        self.notes_timer.timeout.connect(self.pull_notes_deltas)
+
     def build_ui(self):
         """Construct the complete UI layout"""
         main_layout = QVBoxLayout(self)
@@ -994,7 +1138,9 @@ SETTINGS:
         cfg = load_config()
         llm_mode = cfg.get("llm_mode", "ollama")
 
-        if llm_mode == "ollama" and not ollama_has_model():
+        ollama_client.configure(cfg)
+        gemini_client.configure(cfg)
+        if llm_mode == "ollama" and not ollama_client.ollama_has_model():
             QMessageBox.warning(
                 self,
                 "⚠ Local AI Model Not Found",
@@ -1012,7 +1158,12 @@ SETTINGS:
         self.raw_view.clear()
         self.cleaned_view.clear()
 
-        self.worker = Worker(self.files, llm_mode, cfg.get("gemini_api_key", ""))
+        self.worker = Worker(
+            self.files,
+            llm_mode,
+            cfg.get("gemini_api_key", ""),
+            cfg
+        )
         self.worker_thread = QThread()
         self.worker.moveToThread(self.worker_thread)
 
@@ -1025,6 +1176,7 @@ SETTINGS:
         self.worker.error.connect(self.worker_thread.quit)
 
         self.worker_thread.start()
+        self.notes_timer.start(STREAM_INTERVAL_MS)
 
     def update_progress_with_step(self, value: int):
         """Update progress with step indicator"""
@@ -1044,7 +1196,25 @@ SETTINGS:
         
         self.progress_label.setText(step)
 
+    def pull_notes_deltas(self):
+        """Show notes as the model writes them; on_done replaces the preview"""
+        if not self.worker:
+            return
+        retract, text = self.worker.take_notes_deltas()
+        if not retract and not text:
+            return
+        cursor = self.notes_view.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        if retract:
+            # `retract` is in UTF-16 units, like document positions;
+            # moving Left would step by characters instead
+            cursor.setPosition(cursor.position() - retract, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        cursor.insertText(text)
+        self.notes_view.setTextCursor(cursor)
+
     def stop_generation(self):
+        self.notes_timer.stop()
         if self.worker:
             self.worker.cancel()
         if self.worker_thread:
@@ -1053,11 +1223,12 @@ SETTINGS:
         self.unlock_ui()
 
     def on_done(self, notes, data):
+        self.notes_timer.stop()
         self.progress.setValue(100)
         self.progress_label.setText("Complete")
         
         self.notes_view.setPlainText(notes)
-        self.raw_view.setPlainText(data["raw"])
+        self.raw_view.setPlainText(data["raw"].replace(PAGE_BREAK, ""))
         self.cleaned_view.setPlainText(data["cleaned"])
 
         cards = data.get("flashcards", [])
@@ -1110,6 +1281,7 @@ SETTINGS:
         self.unlock_ui()
 
     def on_error(self, err):
+        self.notes_timer.stop()
         error_short = err[:200] + "..." if len(err) > 200 else err
         
         if "timeout" in err.lower():
@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QLabel, QLineEdit,
-    QComboBox, QPushButton, QHBoxLayout
+    QComboBox, QPushButton, QHBoxLayout, QCheckBox
 )
 from studywise.config import load_config, save_config
 
@@ -22,6 +22,9 @@ class SettingsDialog(QDialog):
         self.gemini_input.setText(cfg.get("gemini_api_key", ""))
         self.gemini_input.setEchoMode(QLineEdit.Password)
 
+        self.cache_check = QCheckBox("Reuse cached AI responses")
+        self.cache_check.setChecked(cfg.get("llm_cache", True))
+
         save_btn = QPushButton("Save")
         cancel_btn = QPushButton("Cancel")
         save_btn.clicked.connect(self.save)
@@ -32,6 +35,7 @@ class SettingsDialog(QDialog):
         layout.addWidget(self.mode_combo)
         layout.addWidget(QLabel("Gemini API Key (optional)"))
         layout.addWidget(self.gemini_input)
+        layout.addWidget(self.cache_check)
 
         btns = QHBoxLayout()
         btns.addStretch()
@@ -40,9 +44,12 @@ class SettingsDialog(QDialog):
         layout.addLayout(btns)
 
     def save(self):
-        cfg = {
+        # Keep settings this dialog doesn't edit
+        cfg = load_config()
+        cfg.update({
             "llm_mode": self.mode_combo.currentText(),
-            "gemini_api_key": self.gemini_input.text().strip()
-        }
+            "gemini_api_key": self.gemini_input.text().strip(),
+            "llm_cache": self.cache_check.isChecked()
+        })
         save_config(cfg)
         self.accept()
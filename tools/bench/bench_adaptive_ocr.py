@@ -0,0 +1,66 @@
+"""
+Fixed-DPI versus adaptive OCR of scanned PDF pages.
+
+Runs the PDF OCR path on every scanned page of a PDF with a fixed
+render resolution and with the adaptive mode (draft render, re-render
+only low-confidence pages), serially and without caches. Reports the
+average time per page and word recall. Recall is measured against a
+ground-truth transcript when one is given, otherwise against the
+fixed-DPI output.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_adaptive_ocr.py scanned.pdf [--truth scanned.txt]
+"""
+import argparse
+import time
+
+import fitz  # PyMuPDF
+
+from bench_image_preprocess import recall, words
+from studywise.extractor.pdf_extractor import OCR_BATCH_SIZE, OcrSettings, _ocr_pages
+
+VARIANTS = {
+    "fixed 300": OcrSettings(dpi=300, adaptive=False),
+    "adaptive 200/300": OcrSettings(dpi=300, adaptive=True, draft_dpi=200),
+    "adaptive 150/300": OcrSettings(dpi=300, adaptive=True, draft_dpi=150),
+}
+
+
+def ocr_document(doc, pages: list[int], settings: OcrSettings) -> tuple[str, float]:
+    start = time.perf_counter()
+    texts = []
+    for i in range(0, len(pages), OCR_BATCH_SIZE):
+        texts.extend(_ocr_pages(doc, pages[i:i + OCR_BATCH_SIZE], None, settings))
+    return "\n".join(texts), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf")
+    parser.add_argument("--truth", help="ground-truth transcript of the scanned pages")
+    parser.add_argument("--pages", type=int, default=0, help="limit to the first N scanned pages")
+    args = parser.parse_args()
+
+    doc = fitz.open(args.pdf)
+    pages = [i for i, page in enumerate(doc) if not page.get_text().strip()]
+    if args.pages:
+        pages = pages[:args.pages]
+    if not pages:
+        raise SystemExit("No scanned pages in this PDF")
+
+    reference = None
+    if args.truth:
+        with open(args.truth, encoding="utf-8") as f:
+            reference = words(f.read())
+
+    print(f"{len(pages)} scanned page(s)")
+    print(f"{'variant':>18}  {'s/page':>7}  {'recall':>7}")
+    for label, settings in VARIANTS.items():
+        text, elapsed = ocr_document(doc, pages, settings)
+        if reference is None:
+            reference = words(text)
+        print(f"{label:>18}  {elapsed / len(pages):7.2f}  {recall(reference, words(text)):7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Chunking time against input size, to check it stays linear.
+
+Chunks cleaned synthetic text (see bench_cleaner) of doubling sizes
+with each backend's token budget and reports MB/s; the rate should
+stay roughly flat as the input grows. Then chunks text with words
+longer than a chunk, with overlap, which must still finish in linear
+time.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_chunker.py [--mb 16] [--overlap 64]
+"""
+import argparse
+import time
+
+from bench_cleaner import synthetic_text
+from studywise.ai.summarizer import chunk_text
+from studywise.ai.tokens import CHUNK_TOKENS, estimate_tokens
+from studywise.cleaner.text_cleaner import clean_text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=16, help="largest input size")
+    parser.add_argument("--overlap", type=int, default=64, help="overlap tokens")
+    args = parser.parse_args()
+
+    # One large file per run, so chunking is not split up by FILE markers
+    largest = clean_text(synthetic_text(args.mb << 20).replace("===== FILE:", ""))
+    size = 1 << 20
+    while size <= len(largest):
+        text = "===== FILE: big.pdf =====\n\n" + largest[:size]
+        for mode, budget in CHUNK_TOKENS.items():
+            start = time.perf_counter()
+            chunks = chunk_text(text, budget, args.overlap)
+            elapsed = time.perf_counter() - start
+            biggest = max(estimate_tokens(c) for c in chunks)
+            print(
+                f"{size / 1e6:6.1f} MB {mode:>7}: {len(chunks):6d} chunks, "
+                f"max {biggest} tokens, {size / 1e6 / elapsed:7.1f} MB/s"
+            )
+        size *= 2
+
+    # Words longer than a whole chunk leave no good cut in the window
+    for name, body in (
+        ("long words", ("word " * 5 + "y" * 1000 + " ") * (args.mb << 10)),
+        ("one long word", "a " + "x" * (args.mb << 20)),
+    ):
+        text = "===== FILE: words.pdf =====\n\n" + body
+        start = time.perf_counter()
+        chunks = chunk_text(text, 100, max(args.overlap, 20))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{len(body) / 1e6:6.1f} MB {name}: {len(chunks):6d} chunks, "
+            f"{len(body) / 1e6 / elapsed:7.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
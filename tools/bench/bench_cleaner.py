@@ -0,0 +1,77 @@
+"""
+Throughput of the text cleaner on multi-megabyte input.
+
+Builds a synthetic extraction result (FILE separators, wrapped lines,
+tabs and runs of spaces, blank-line runs, mojibake) of the requested
+size. Times clean_text on it whole, and TextCleaner fed in page-sized
+pieces, and reports MB/s for each.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_cleaner.py [--mb 8] [--runs 3]
+"""
+import argparse
+import random
+import time
+
+from studywise.cleaner.text_cleaner import TextCleaner, clean_text
+
+PAGE_CHARS = 3000
+
+
+def synthetic_text(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    vocab = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10)))
+        for _ in range(2000)
+    ] + ["â€™s", "â€“", "ï¿½", "\t", "  "]
+
+    parts = []
+    total = 0
+    file_no = 0
+    while total < size:
+        if rng.random() < 0.01:
+            file_no += 1
+            part = f"\n\n===== FILE: lecture_{file_no}.pdf =====\n\n"
+        else:
+            words = " ".join(rng.choice(vocab) for _ in range(rng.randint(4, 14)))
+            part = words + ("\n\n\n" if rng.random() < 0.1 else "\n")
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def best_of(runs: int, fn) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    text = synthetic_text(int(args.mb * 1024 * 1024))
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    pages = [text[i:i + PAGE_CHARS] for i in range(0, len(text), PAGE_CHARS)]
+
+    def streamed():
+        cleaner = TextCleaner()
+        out = [cleaner.feed(page) for page in pages]
+        out.append(cleaner.finish())
+        return "".join(out)
+
+    assert streamed() == clean_text(text)
+
+    print(f"input: {mb:.1f} MB, {len(pages)} pieces")
+    for label, fn in (("clean_text", lambda: clean_text(text)), ("streamed", streamed)):
+        seconds = best_of(args.runs, fn)
+        print(f"{label:>12}: {mb / seconds:7.1f} MB/s ({seconds * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Gemini chunk throughput: one blocking call per chunk against the
+client's async batch (GeminiClient.generate_many), plain and streamed.
+
+Runs offline against a fake model with a fixed latency per request and
+optional rate-limit errors, so only the client's scheduling is measured.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_gemini.py [--chunks 32] [--latency 0.25]
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+
+from studywise.ai.gemini_client import GeminiClient
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    """Async iterable over a response in a few pieces, like a streamed one."""
+
+    def __init__(self, response: FakeResponse):
+        self.pieces = [response.text[i:i + 8] for i in range(0, len(response.text), 8)]
+
+    async def __aiter__(self):
+        for piece in self.pieces:
+            await asyncio.sleep(0)
+            yield FakeResponse(piece)
+
+
+class FakeModel:
+    """Answers like GenerativeModel, after `latency` seconds."""
+
+    def __init__(self, latency: float, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt: str) -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+        if random.random() < self.error_rate:
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+        return FakeResponse(f"notes for {len(prompt)} chars")
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        time.sleep(self.latency)
+        response = self._answer(prompt)
+        return [response] if stream else response
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        await asyncio.sleep(self.latency)
+        response = self._answer(prompt)
+        return FakeStream(response) if stream else response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds per request")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests rate limited")
+    args = parser.parse_args()
+
+    prompts = [f"chunk {i} " * 200 for i in range(args.chunks)]
+    model = FakeModel(args.latency, args.error_rate)
+    client = GeminiClient("bench-key", model_factory=lambda key, name: model)
+
+    start = time.perf_counter()
+    sequential = [client.generate(p) for p in prompts]
+    seq_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = client.generate_many(prompts, args.concurrency)
+    batch_time = time.perf_counter() - start
+
+    pieces = []
+    start = time.perf_counter()
+    streamed = client.generate_many(prompts, args.concurrency, on_delta=lambda i, text: pieces.append(text))
+    stream_time = time.perf_counter() - start
+    client.close()
+
+    assert batched == sequential == streamed
+    print(f"sequential : {seq_time:6.2f}s ({args.chunks / seq_time:5.1f} chunks/s)")
+    print(
+        f"batched x{args.concurrency:<2}: {batch_time:6.2f}s "
+        f"({args.chunks / batch_time:5.1f} chunks/s)"
+    )
+    print(
+        f"streamed x{args.concurrency:<2}: {stream_time:6.2f}s "
+        f"({args.chunks / stream_time:5.1f} chunks/s, {len(pieces)} deltas), "
+        f"{model.calls} requests in total"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+OCR time versus text recall for image preprocessing settings.
+
+The corpus is a directory of images, each with a ground-truth transcript
+next to it (photo1.jpg + photo1.txt). Recall is the share of ground-truth
+words (lowercased, punctuation stripped) that appear in the OCR output.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_image_preprocess.py corpus_dir
+"""
+import argparse
+import os
+import re
+import time
+from collections import Counter
+
+from PIL import Image
+import pytesseract
+
+from studywise.extractor.image_preprocess import preprocess_for_ocr
+
+VARIANTS = {
+    "original": None,
+    "gray": {"max_megapixels": 0, "crop_margins": False},
+    "12 MP": {"max_megapixels": 12},
+    "8 MP": {"max_megapixels": 8},
+    "4 MP": {"max_megapixels": 4},
+    "8 MP + binarize": {"max_megapixels": 8, "binarize": True},
+}
+
+
+def words(text: str) -> Counter:
+    return Counter(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def recall(expected: Counter, got: Counter) -> float:
+    total = sum(expected.values())
+    if not total:
+        return 1.0
+    return sum(min(n, got[w]) for w, n in expected.items()) / total
+
+
+def load_corpus(directory: str) -> list[tuple[str, Counter]]:
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        truth = os.path.join(directory, stem + ".txt")
+        if ext.lower() in (".png", ".jpg", ".jpeg") and os.path.exists(truth):
+            with open(truth, encoding="utf-8") as f:
+                corpus.append((os.path.join(directory, name), words(f.read())))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus_dir")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus_dir)
+    if not corpus:
+        raise SystemExit("No image + .txt pairs found")
+
+    print(f"{len(corpus)} image(s)")
+    print(f"{'variant':>16}  {'s/image':>8}  {'recall':>7}")
+    for label, settings in VARIANTS.items():
+        elapsed = 0.0
+        scores = []
+        for path, expected in corpus:
+            with Image.open(path) as image:
+                start = time.perf_counter()
+                prepared = image if settings is None else preprocess_for_ocr(image, **settings)
+                text = pytesseract.image_to_string(prepared)
+                elapsed += time.perf_counter() - start
+            scores.append(recall(expected, words(text)))
+        print(f"{label:>16}  {elapsed / len(corpus):8.2f}  {sum(scores) / len(scores):7.1%}")
+
+
+if __name__ == "__main__":
+    main()
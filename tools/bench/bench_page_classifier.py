@@ -0,0 +1,98 @@
+"""
+Thumbnail page classifier on synthetic pages.
+
+Builds grayscale thumbnails the size classify_page renders (a letter
+page at THUMBNAIL_DPI) for pages that must be told apart: empty, specks,
+coloured paper and bleed-through (blank), a single text line and a title
+(sparse text), full text, and a photo. Checks each label and reports
+the time per thumbnail.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_page_classifier.py [--repeat 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from studywise.extractor.page_classifier import (
+    PAGE_BLANK, PAGE_PICTURE, PAGE_TEXT, THUMBNAIL_DPI, classify_pixels
+)
+
+WIDTH = int(8.5 * THUMBNAIL_DPI)
+HEIGHT = int(11 * THUMBNAIL_DPI)
+
+
+def paper(rng, level: int = 245, noise: float = 2.0) -> np.ndarray:
+    page = rng.normal(level, noise, (HEIGHT, WIDTH))
+    return np.clip(page, 0, 255)
+
+
+def text_line(page, rng, top: int, left: int, length: int, height: int, ink: int = 40) -> None:
+    """Strokes of a text line: a share of the pixels in its band are dark."""
+    band = page[top:top + height, left:left + length]
+    strokes = rng.random(band.shape) < 0.3
+    band[strokes] = ink
+
+
+def make_pages(rng) -> list[tuple[str, str, np.ndarray]]:
+    pages = []
+
+    pages.append(("empty", PAGE_BLANK, paper(rng)))
+
+    page = paper(rng)
+    page[rng.integers(0, HEIGHT, 12), rng.integers(0, WIDTH, 12)] = 30
+    pages.append(("scanner specks", PAGE_BLANK, page))
+
+    pages.append(("grey paper", PAGE_BLANK, paper(rng, level=190, noise=3.0)))
+
+    page = paper(rng)
+    for top in range(40, HEIGHT - 40, 9):
+        text_line(page, rng, top, 30, WIDTH - 60, 3, ink=215)
+    pages.append(("bleed-through", PAGE_BLANK, page))
+
+    # An 11pt line is about 5 px high at 36 dpi, its strokes blurred to grey
+    page = paper(rng)
+    text_line(page, rng, 60, 30, 120, 5, ink=150)
+    pages.append(("single line", PAGE_TEXT, page))
+
+    page = paper(rng)
+    text_line(page, rng, HEIGHT // 3, WIDTH // 4, WIDTH // 2, 10)
+    pages.append(("title", PAGE_TEXT, page))
+
+    page = paper(rng)
+    for top in range(40, HEIGHT - 40, 9):
+        text_line(page, rng, top, 30, WIDTH - 60, 5)
+    pages.append(("full text", PAGE_TEXT, page))
+
+    page = paper(rng)
+    page[60:HEIGHT - 60, 30:WIDTH - 30] = rng.integers(60, 180, (HEIGHT - 120, WIDTH - 60))
+    pages.append(("photo", PAGE_PICTURE, page))
+
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200, help="classifications per page")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{WIDTH}x{HEIGHT} thumbnails")
+    print(f"{'page':>15}  {'expected':>8}  {'got':>8}  {'ms':>6}")
+    wrong = 0
+    for name, expected, pixels in make_pages(rng):
+        samples = pixels.astype(np.uint8).tobytes()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            got = classify_pixels(samples, WIDTH, HEIGHT, WIDTH)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        wrong += got != expected
+        print(f"{name:>15}  {expected:>8}  {got:>8}  {elapsed * 1000:6.2f}")
+
+    if wrong:
+        raise SystemExit(f"{wrong} page(s) misclassified")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-page cost of turning a rendered PDF page into OCR input.
+
+Compares the old path (RGB pixmap -> PNG bytes -> PIL decode) with the
+direct grayscale path in pdf_extractor (pixmap samples wrapped by PIL).
+Only the conversion is timed by default; pass --ocr to include tesseract.
+Peak memory is what tracemalloc sees (Python objects such as the PNG
+bytes), not buffers allocated inside MuPDF or PIL.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_pixmap_ocr.py scanned.pdf [--pages 20] [--ocr]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import fitz  # PyMuPDF
+from PIL import Image
+import pytesseract
+
+from studywise.extractor.pdf_extractor import OCR_DPI, pixmap_to_image, render_page
+
+
+def png_path(page):
+    pix = page.get_pixmap(dpi=OCR_DPI)
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    image.load()
+    return image
+
+
+def direct_path(page):
+    pix = render_page(page)
+    image = pixmap_to_image(pix)
+    image.load()
+    return image, pix
+
+
+def run(label, fn, doc, pages, ocr):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(pages):
+        result = fn(doc[i])
+        image = result[0] if isinstance(result, tuple) else result
+        if ocr:
+            pytesseract.image_to_string(image)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>8}: {elapsed / pages * 1000:8.1f} ms/page  peak {peak / 1e6:7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--ocr", action="store_true")
+    args = parser.parse_args()
+
+    doc = fitz.open(args.pdf)
+    pages = min(args.pages, doc.page_count)
+    print(f"{pages} page(s) at {OCR_DPI} dpi{' with OCR' if args.ocr else ''}")
+    run("png", png_path, doc, pages, args.ocr)
+    run("direct", direct_path, doc, pages, args.ocr)
+
+
+if __name__ == "__main__":
+    main()
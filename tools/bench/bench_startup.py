@@ -0,0 +1,70 @@
+"""
+Import-time budget for the two entry points.
+
+Imports `studywise.main` (CLI) and `studywise.__main__` (GUI, which pulls
+in PySide6) in fresh interpreters, best of several runs, and exits
+non-zero if either one takes longer than its budget or loads one of the
+heavy optional dependencies that should only be imported on first use.
+
+Usage:
+    PYTHONPATH=src python tools/bench/bench_startup.py [--cli-ms 150] [--gui-ms 1500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ("fitz", "PIL", "pytesseract", "google.generativeai", "docx", "tesserocr")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{elapsed:.1f}} {{','.join(loaded)}}")
+"""
+
+
+def measure(module: str, runs: int) -> tuple[float, list[str]]:
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath(src), env.get("PYTHONPATH")]))
+
+    best = float("inf")
+    loaded: list[str] = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, env=env, check=True,
+        ).stdout.split()
+        best = min(best, float(out[0]))
+        loaded = out[1].split(",") if len(out) > 1 else []
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cli-ms", type=float, default=150)
+    parser.add_argument("--gui-ms", type=float, default=1500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-gui", action="store_true", help="when PySide6 isn't installed")
+    args = parser.parse_args()
+
+    targets = [("python -m studywise.main", "studywise.main", args.cli_ms)]
+    if not args.skip_gui:
+        targets.append(("python -m studywise", "studywise.__main__", args.gui_ms))
+
+    failed = False
+    for label, module, budget in targets:
+        ms, loaded = measure(module, args.runs)
+        ok = ms <= budget and not loaded
+        failed |= not ok
+        extra = f"  loaded eagerly: {', '.join(loaded)}" if loaded else ""
+        print(f"{'OK  ' if ok else 'FAIL'} {label:<26} {ms:8.1f} ms (budget {budget:.0f} ms){extra}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()